@@ -0,0 +1,183 @@
+"""
+Hot/cold tiering for defects.
+
+Resolved defects older than ARCHIVE_AFTER_DAYS are moved out of the hot
+`defects` table, so its indexes and scans stay small. They go to the
+`defect_archive` table, or with ARCHIVE_BACKEND=parquet (requires pyarrow)
+to zstd-compressed Parquet files partitioned by month under ARCHIVE_DIR.
+Read paths opt in to archived data with `include_archived`.
+
+Run it periodically (or call POST /admin/archive):
+    python archive.py                        # ARCHIVE_AFTER_DAYS (default 180)
+    python archive.py --older-than-days 90 --dry-run
+"""
+import os
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from sqlalchemy import func, insert, Integer, Float, DateTime
+
+from database import Defect, DefectArchive, SessionLocal, engine
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_BACKEND = os.getenv("ARCHIVE_BACKEND", "table").lower()  # "table" or "parquet"
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", Path(__file__).parent / "archive"))
+
+ARCHIVE_COLUMNS = [column.name for column in DefectArchive.__table__.columns]
+
+def load_pyarrow():
+    """pyarrow is optional and heavy, so it's only imported when Parquet is used."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+def archive_backend():
+    if ARCHIVE_BACKEND == "parquet":
+        if load_pyarrow() is None:
+            print("⚠️  pyarrow not installed. Install with: pip install pyarrow")
+            print("   Archiving to the defect_archive table instead.")
+            return "table"
+        return "parquet"
+    return "table"
+
+def parquet_schema(pa):
+    """Arrow schema mirroring the defect_archive columns."""
+    fields = []
+    for column in DefectArchive.__table__.columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append((column.name, arrow_type))
+    return pa.schema(fields)
+
+def write_parquet(rows):
+    """Write one batch of archived rows as a file per month of detection."""
+    pa = load_pyarrow()
+    schema = parquet_schema(pa)
+
+    by_month = {}
+    for row in rows:
+        month = (row["timestamp"] or row["archived_at"]).strftime("%Y-%m")
+        by_month.setdefault(month, []).append(row)
+
+    for month, month_rows in by_month.items():
+        directory = ARCHIVE_DIR / f"month={month}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"defects-{month_rows[0]['id']}-{month_rows[-1]['id']}.parquet"
+        # Write then rename, so readers never see a partial file
+        temp_path = path.with_suffix(".tmp")
+        pa.parquet.write_table(pa.Table.from_pylist(month_rows, schema=schema), temp_path, compression="zstd")
+        os.replace(temp_path, path)
+
+def read_parquet(columns=None):
+    """All records from the Parquet archive (deduplicated by id), or [] if there is none."""
+    if not ARCHIVE_DIR.exists():
+        return []
+    paths = sorted(ARCHIVE_DIR.glob("month=*/*.parquet"))
+    if not paths:
+        return []
+    pa = load_pyarrow()
+    if pa is None:
+        print(f"⚠️  Parquet archive found in {ARCHIVE_DIR} but pyarrow is not installed; skipping it")
+        return []
+
+    if columns and "id" not in columns:
+        columns = ["id"] + list(columns)
+    records = {}
+    for path in paths:
+        for record in pa.parquet.read_table(path, columns=columns).to_pylist():
+            # A job interrupted between writing and deleting can archive a row twice
+            records[record["id"]] = record
+    return list(records.values())
+
+def archive_resolved_defects(db, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """
+    Move resolved defects resolved more than `older_than_days` ago into cold storage.
+    Returns the number of defects moved (or eligible, with dry_run).
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    eligible = db.query(Defect).filter(Defect.status == "Resolved", Defect.resolved_at < cutoff)
+    if dry_run:
+        return eligible.count()
+
+    backend = archive_backend()
+    total = 0
+    last_id = 0
+    while True:
+        # Keyset pagination so each batch continues where the last one stopped
+        batch = eligible.filter(Defect.id > last_id).order_by(Defect.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        archived_at = datetime.now()
+        rows = [
+            {**{name: getattr(defect, name, None) for name in ARCHIVE_COLUMNS}, "archived_at": archived_at}
+            for defect in batch
+        ]
+        if backend == "parquet":
+            write_parquet(rows)
+        else:
+            db.execute(insert(DefectArchive), rows)
+        ids = [row["id"] for row in rows]
+        db.query(Defect).filter(Defect.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+        last_id = ids[-1]
+        total += len(ids)
+
+    if total:
+        print(f"✅ Archived {total} resolved defects older than {older_than_days} days ({backend})")
+    return total
+
+def load_archived_defects(db):
+    """All archived defects from the table and the Parquet files, newest first."""
+    defects = db.query(DefectArchive).all()
+    seen = {defect.id for defect in defects}
+    for record in read_parquet():
+        if record["id"] not in seen:
+            defects.append(SimpleNamespace(**record))
+    defects.sort(key=lambda defect: defect.timestamp or datetime.min, reverse=True)
+    return defects
+
+def archived_counts(db, column):
+    """{value: count} of archived defects grouped by `column` (e.g. "severity")."""
+    attribute = getattr(DefectArchive, column)
+    counts = dict(db.query(attribute, func.count(DefectArchive.id)).group_by(attribute).all())
+    for record in read_parquet(columns=[column]):
+        counts[record[column]] = counts.get(record[column], 0) + 1
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old resolved defects")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Only count eligible defects")
+    args = parser.parse_args()
+
+    DefectArchive.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        count = archive_resolved_defects(db, args.older_than_days, args.batch_size, args.dry_run)
+    finally:
+        db.close()
+    if args.dry_run:
+        print(f"{count} resolved defects older than {args.older_than_days} days would be archived")
+    elif not count:
+        print("Nothing to archive")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ import os
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+# Short-lived tokens for URLs (EventSource can't send an Authorization header)
+STREAM_TOKEN_SCOPE = "drone-logs"
+STREAM_TOKEN_EXPIRE_SECONDS = 60
 
 # Password hashing - using argon2 instead of bcrypt due to Windows compatibility issues
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
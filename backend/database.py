@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
+import hashlib
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, inspect, text, update
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -53,9 +54,14 @@ class Defect(Base):
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     nearest_station = Column(String, nullable=True)
+    geohash = Column(String(12), nullable=True, index=True)  # Spatial cell id, see location_utils
     
     timestamp = Column(DateTime, default=datetime.now)
     
+    # Repeated detections of the same fault are merged into one row
+    hit_count = Column(Integer, default=1)
+    last_seen_at = Column(DateTime, nullable=True)
+    
     # Analysis results
     severity = Column(String, default="Pending") # Low, High, Critical
     root_cause = Column(String, nullable=True)
@@ -74,5 +80,217 @@ class Defect(Base):
     assigned_station = relationship("Station")
     resolver = relationship("User", foreign_keys=[resolved_by])
 
+class DefectArchive(Base):
+    """
+    Cold storage for old resolved defects, see archive.py.
+    Same columns as defects (ids are kept) without foreign keys, so stations
+    and users can still be deleted.
+    """
+    __tablename__ = "defect_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    defect_type = Column(String)
+    confidence = Column(Float)
+    image_url = Column(String)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    nearest_station = Column(String, nullable=True)
+    geohash = Column(String(12), nullable=True)
+    timestamp = Column(DateTime, index=True)
+    hit_count = Column(Integer, default=1)
+    last_seen_at = Column(DateTime, nullable=True)
+    severity = Column(String)
+    root_cause = Column(String, nullable=True)
+    action_required = Column(String, nullable=True)
+    resolution_steps = Column(String, nullable=True)
+    status = Column(String)
+    resolved_at = Column(DateTime, nullable=True)
+    resolved_by = Column(Integer, nullable=True)
+    assigned_station_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, default=datetime.now)
+
+class DroneRun(Base):
+    """Drone run state shared by every API worker, see drone_control.py."""
+    __tablename__ = "drone_runs"
+
+    name = Column(String(64), primary_key=True)
+    status = Column(String(16), default="stopped")  # starting, running, stopped, crashed
+    owner = Column(String(128), nullable=True)  # host:pid of the API worker running the process
+    pid = Column(Integer, nullable=True)
+    stop_requested = Column(Boolean, default=False)
+    exit_code = Column(Integer, nullable=True)
+    # Fleet workers (see fleet.py): JSON launch config, latest JSON STATS line, restart count
+    config = Column(String, nullable=True)
+    stats = Column(String, nullable=True)
+    restarts = Column(Integer, default=0)
+    # UTC, compared across nodes
+    heartbeat_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    stopped_at = Column(DateTime, nullable=True)
+
+class IdempotencyRecord(Base):
+    """First response to each Idempotency-Key, shared by every API worker, see idempotency.py."""
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request
+    owner = Column(String(32), nullable=False)  # random token of the request that runs it
+    response = Column(String, nullable=True)  # JSON, NULL while the first request is in flight
+    # UTC, compared across nodes
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class AppMeta(Base):
+    """Key/value facts about the database itself, e.g. which startup tasks have run."""
+    __tablename__ = "app_meta"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(String, nullable=True)
+
+# Columns added after the initial schema; create_all() won't add them to existing tables
+MIGRATION_COLUMNS = [
+    ("defects", "geohash", "VARCHAR(12)"),
+    ("defects", "hit_count", "INTEGER DEFAULT 1"),
+    ("defects", "last_seen_at", "TIMESTAMP"),
+    ("drone_runs", "config", "TEXT"),
+    ("drone_runs", "stats", "TEXT"),
+    ("drone_runs", "restarts", "INTEGER DEFAULT 0"),
+]
+
+MIGRATION_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_defects_geohash ON defects (geohash)",
+]
+
+# PostgreSQL only serves LIKE 'prefix%' from a btree index built with
+# text_pattern_ops unless the database collation is "C"; see location_utils
+MIGRATION_INDEXES_POSTGRES = [
+    "CREATE INDEX IF NOT EXISTS ix_defects_geohash_pattern ON defects (geohash text_pattern_ops)",
+]
+
+# Full-text search over the analysis text, see search.py.
+# SQLite: FTS5 table over defects (external content) kept in sync by triggers.
+SEARCH_FTS_SQLITE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS defects_fts USING fts5(
+        root_cause, action_required, resolution_steps,
+        content='defects', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS defects_fts_ai AFTER INSERT ON defects BEGIN
+        INSERT INTO defects_fts(rowid, root_cause, action_required, resolution_steps)
+        VALUES (new.id, new.root_cause, new.action_required, new.resolution_steps);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS defects_fts_ad AFTER DELETE ON defects BEGIN
+        INSERT INTO defects_fts(defects_fts, rowid, root_cause, action_required, resolution_steps)
+        VALUES ('delete', old.id, old.root_cause, old.action_required, old.resolution_steps);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS defects_fts_au AFTER UPDATE OF root_cause, action_required, resolution_steps ON defects BEGIN
+        INSERT INTO defects_fts(defects_fts, rowid, root_cause, action_required, resolution_steps)
+        VALUES ('delete', old.id, old.root_cause, old.action_required, old.resolution_steps);
+        INSERT INTO defects_fts(rowid, root_cause, action_required, resolution_steps)
+        VALUES (new.id, new.root_cause, new.action_required, new.resolution_steps);
+    END""",
+]
+
+# PostgreSQL: GIN index on the same expression search.py queries; PG keeps it in sync
+SEARCH_DOCUMENT_POSTGRES = (
+    "to_tsvector('english', coalesce(root_cause, '') || ' ' || "
+    "coalesce(action_required, '') || ' ' || coalesce(resolution_steps, ''))"
+)
+SEARCH_INDEX_POSTGRES = [
+    f"CREATE INDEX IF NOT EXISTS ix_defects_search ON defects USING GIN ({SEARCH_DOCUMENT_POSTGRES})",
+]
+
+def migrate_search_index():
+    """Create the full-text index for the current database, filling it for existing rows."""
+    with engine.begin() as conn:
+        if DATABASE_URL.startswith("sqlite"):
+            existed = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'defects_fts'"
+            )).first() is not None
+            for statement in SEARCH_FTS_SQLITE:
+                conn.execute(text(statement))
+            if not existed:
+                conn.execute(text("INSERT INTO defects_fts(defects_fts) VALUES ('rebuild')"))
+                print("✅ Built full-text search index")
+        elif DATABASE_URL.startswith("postgresql"):
+            for statement in SEARCH_INDEX_POSTGRES:
+                conn.execute(text(statement))
+
+def migrate_db():
+    """Add missing columns and indexes to databases created by older versions."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl_type in MIGRATION_COLUMNS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+                print(f"✅ Added column {table}.{column}")
+        for statement in MIGRATION_INDEXES:
+            conn.execute(text(statement))
+        if DATABASE_URL.startswith("postgresql"):
+            for statement in MIGRATION_INDEXES_POSTGRES:
+                conn.execute(text(statement))
+
+def backfill_geohashes(batch_size=1000):
+    """Populate the geohash column for defects stored before it existed."""
+    from location_utils import defect_geohash
+
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            rows = db.query(Defect.id, Defect.latitude, Defect.longitude).filter(
+                Defect.geohash.is_(None),
+                Defect.latitude.isnot(None),
+                Defect.longitude.isnot(None)
+            ).limit(batch_size).all()
+            if not rows:
+                break
+            db.execute(update(Defect), [
+                {"id": row.id, "geohash": defect_geohash(row.latitude, row.longitude)}
+                for row in rows
+            ])
+            db.commit()
+            total += len(rows)
+    finally:
+        db.close()
+
+    if total:
+        print(f"✅ Backfilled geohash for {total} defects")
+    return total
+
+STARTUP_TASKS_KEY = "startup_tasks_version"
+
+def schema_fingerprint():
+    """
+    Hash of the tables, columns and migrations this code expects.
+    Changes on every schema upgrade, so one-time startup tasks re-run after a deploy.
+    """
+    parts = [
+        table.name + ":" + ",".join(column.name for column in table.columns)
+        for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name)
+    ]
+    parts.extend(f"{table}.{column} {ddl_type}" for table, column, ddl_type in MIGRATION_COLUMNS)
+    parts.extend(MIGRATION_INDEXES + MIGRATION_INDEXES_POSTGRES)
+    parts.extend(SEARCH_FTS_SQLITE + SEARCH_INDEX_POSTGRES)
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:16]
+
+def startup_tasks_done(db):
+    """True when the startup tasks already ran against the current schema."""
+    try:
+        row = db.get(AppMeta, STARTUP_TASKS_KEY)
+    except Exception:
+        # app_meta doesn't exist yet: fresh or pre-upgrade database
+        db.rollback()
+        return False
+    return row is not None and row.value == schema_fingerprint()
+
+def mark_startup_tasks_done(db):
+    db.merge(AppMeta(key=STARTUP_TASKS_KEY, value=schema_fingerprint()))
+    db.commit()
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+    migrate_search_index()
+    backfill_geohashes()
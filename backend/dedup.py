@@ -0,0 +1,147 @@
+import os
+import math
+import time
+import threading
+from location_utils import haversine_distance, KM_PER_DEGREE_LAT
+
+# A hovering drone reports the same fault many times; detections of the same
+# type closer than this (in space and time) are merged into one defect.
+DEDUP_DISTANCE_METERS = float(os.getenv("DEDUP_DISTANCE_METERS", "25"))
+DEDUP_WINDOW_SECONDS = float(os.getenv("DEDUP_WINDOW_SECONDS", "300"))
+DEDUP_PENDING_TIMEOUT_SECONDS = 60
+
+class RecentDetection:
+    """A defect seen recently, or one that is still being analyzed (defect_id is None)."""
+
+    def __init__(self, defect_type, latitude, longitude, seen_at, defect_id=None):
+        self.defect_type = defect_type
+        self.latitude = latitude
+        self.longitude = longitude
+        self.seen_at = seen_at
+        self.defect_id = defect_id
+        self.ready = threading.Event()
+        if defect_id is not None:
+            self.ready.set()
+
+class RecentDetectionIndex:
+    """
+    In-memory grid of recent detections.
+    Cells are DEDUP_DISTANCE_METERS tall, so a match can only be in the
+    same cell or a neighbouring one.
+    """
+
+    def __init__(self, distance_meters=DEDUP_DISTANCE_METERS, window_seconds=DEDUP_WINDOW_SECONDS):
+        self.distance_km = distance_meters / 1000
+        self.window_seconds = window_seconds
+        self.cell_degrees = max(self.distance_km / KM_PER_DEGREE_LAT, 1e-6)
+        self._cells = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.distance_km > 0 and self.window_seconds > 0
+
+    def _cell(self, latitude, longitude):
+        return (math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees))
+
+    def _neighbour_cells(self, latitude, longitude):
+        row, col = self._cell(latitude, longitude)
+        # Degrees of longitude shrink towards the poles, so look further east/west
+        lon_reach = math.ceil(1 / max(math.cos(math.radians(latitude)), 0.01))
+        for d_row in (-1, 0, 1):
+            for d_col in range(-lon_reach, lon_reach + 1):
+                yield (row + d_row, col + d_col)
+
+    def _prune(self, now):
+        if now - self._last_prune < self.window_seconds:
+            return
+        self._last_prune = now
+        for key in list(self._cells):
+            alive = [e for e in self._cells[key] if now - e.seen_at <= self.window_seconds]
+            if alive:
+                self._cells[key] = alive
+            else:
+                del self._cells[key]
+
+    def match_or_reserve(self, defect_type, latitude, longitude):
+        """
+        Returns (entry, is_new).
+        If a recent detection matches, it is refreshed and returned with is_new False.
+        Otherwise a pending entry is reserved for the caller, who must later call
+        `confirm()` with the stored defect id or `release()` on failure.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+
+            best = None
+            best_distance = None
+            for key in self._neighbour_cells(latitude, longitude):
+                for entry in self._cells.get(key, ()):
+                    if entry.defect_type != defect_type or now - entry.seen_at > self.window_seconds:
+                        continue
+                    distance = haversine_distance(latitude, longitude, entry.latitude, entry.longitude)
+                    if distance <= self.distance_km and (best is None or distance < best_distance):
+                        best = entry
+                        best_distance = distance
+
+            if best is not None:
+                best.seen_at = now
+                return best, False
+
+            entry = RecentDetection(defect_type, latitude, longitude, now)
+            self._cells.setdefault(self._cell(latitude, longitude), []).append(entry)
+            return entry, True
+
+    def confirm(self, entry, defect_id):
+        entry.defect_id = defect_id
+        entry.ready.set()
+
+    def _remove(self, entry):
+        bucket = self._cells.get(self._cell(entry.latitude, entry.longitude), [])
+        if entry in bucket:
+            bucket.remove(entry)
+
+    def release(self, entry):
+        """Drop a reservation whose defect was not stored. Only the reserving caller may release."""
+        with self._lock:
+            self._remove(entry)
+        entry.ready.set()
+
+    def discard(self, entry):
+        """Drop a confirmed entry whose defect was deleted or resolved; pending entries are left alone."""
+        with self._lock:
+            if entry.defect_id is not None:
+                self._remove(entry)
+
+    def add(self, defect_type, latitude, longitude, defect_id, age_seconds=0.0):
+        """Register an already stored defect, e.g. when warming up from the DB."""
+        entry = RecentDetection(defect_type, latitude, longitude, time.monotonic() - age_seconds, defect_id)
+        with self._lock:
+            self._cells.setdefault(self._cell(latitude, longitude), []).append(entry)
+        return entry
+
+    def load_recent(self, db):
+        """Warm the index with open defects seen inside the window, so restarts don't reset dedup."""
+        from datetime import datetime, timedelta
+        from sqlalchemy import func
+        from database import Defect
+
+        if not self.enabled:
+            return 0
+
+        now = datetime.now()
+        last_seen = func.coalesce(Defect.last_seen_at, Defect.timestamp)
+        rows = db.query(Defect.id, Defect.defect_type, Defect.latitude, Defect.longitude, last_seen).filter(
+            last_seen >= now - timedelta(seconds=self.window_seconds),
+            Defect.status != "Resolved",
+            Defect.latitude.isnot(None),
+            Defect.longitude.isnot(None)
+        ).all()
+
+        for defect_id, defect_type, latitude, longitude, seen in rows:
+            self.add(defect_type, latitude, longitude, defect_id, (now - seen).total_seconds())
+        return len(rows)
+
+detection_index = RecentDetectionIndex()
@@ -0,0 +1,239 @@
+import os
+import time
+import socket
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+
+from database import DroneRun, SessionLocal
+
+# The owning worker refreshes heartbeat_at this often; a run whose heartbeat
+# is older than the timeout is treated as dead and can be started again.
+DRONE_HEARTBEAT_SECONDS = float(os.getenv("DRONE_HEARTBEAT_SECONDS", "2"))
+DRONE_HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("DRONE_HEARTBEAT_TIMEOUT_SECONDS", "10"))
+DRONE_STOP_WAIT_SECONDS = float(os.getenv("DRONE_STOP_WAIT_SECONDS", "10"))
+
+LIVE_STATUSES = ("starting", "running")
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def terminate_process(process, timeout=5):
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+class DroneController:
+    """
+    Drone runs shared by every API worker and node through the drone_runs table.
+
+    Starting a run claims its row with a single conditional UPDATE, so only
+    one worker can win. That worker owns the subprocess and heartbeats the
+    row; any worker can read the status or set stop_requested, which the
+    owner acts on at its next heartbeat.
+    """
+
+    def __init__(self):
+        self.processes = {}
+        self._lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._shutdown = threading.Event()
+
+    @property
+    def worker_id(self):
+        # Evaluated per call: forked workers share the import but not the pid
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def is_alive(self, run):
+        return (
+            run is not None
+            and run.status in LIVE_STATUSES
+            and run.heartbeat_at is not None
+            and utcnow() - run.heartbeat_at < timedelta(seconds=DRONE_HEARTBEAT_TIMEOUT_SECONDS)
+        )
+
+    def claim(self, db, name):
+        """Take ownership of run `name` unless a live run holds it. Returns True on success."""
+        if db.get(DroneRun, name) is None:
+            try:
+                db.add(DroneRun(name=name, status="stopped"))
+                db.commit()
+            except IntegrityError:
+                # Another worker created the row first
+                db.rollback()
+
+        now = utcnow()
+        stale_before = now - timedelta(seconds=DRONE_HEARTBEAT_TIMEOUT_SECONDS)
+        result = db.execute(
+            update(DroneRun)
+            .where(
+                DroneRun.name == name,
+                or_(
+                    DroneRun.status.notin_(LIVE_STATUSES),
+                    DroneRun.heartbeat_at.is_(None),
+                    DroneRun.heartbeat_at < stale_before
+                )
+            )
+            .values(status="starting", owner=self.worker_id, pid=None, stop_requested=False,
+                    exit_code=None, heartbeat_at=now, started_at=now, stopped_at=None)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def update_owned(self, db, name, **values):
+        """Update the run only while this worker still owns it. Returns True if it did."""
+        result = db.execute(
+            update(DroneRun)
+            .where(DroneRun.name == name, DroneRun.owner == self.worker_id)
+            .values(**values)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def _mark_stopped(self, db, name, status="stopped", exit_code=None):
+        self.update_owned(db, name, status=status, exit_code=exit_code, pid=None,
+                           stop_requested=False, stopped_at=utcnow())
+
+    def start(self, db, name, command, **popen_kwargs):
+        """
+        Claim run `name` and launch `command` in this worker.
+        Returns the process, or None if the run is already live elsewhere.
+        """
+        if not self.claim(db, name):
+            return None
+        try:
+            process = subprocess.Popen(command, **popen_kwargs)
+        except Exception:
+            self._mark_stopped(db, name, status="crashed")
+            raise
+
+        with self._lock:
+            self.processes[name] = process
+        self.update_owned(db, name, status="running", pid=process.pid, heartbeat_at=utcnow())
+        self._ensure_heartbeat()
+        return process
+
+    def stop(self, db, name, wait_seconds=DRONE_STOP_WAIT_SECONDS):
+        """
+        Stop run `name` wherever it runs.
+        Returns "stopped", "stopping" (requested, owner hasn't acted yet) or None if not running.
+        """
+        with self._lock:
+            process = self.processes.pop(name, None)
+        if process is not None:
+            terminate_process(process)
+            self._mark_stopped(db, name, exit_code=process.returncode)
+            return "stopped"
+
+        if not self.is_alive(db.get(DroneRun, name)):
+            return None
+        db.execute(
+            update(DroneRun)
+            .where(DroneRun.name == name, DroneRun.status.in_(LIVE_STATUSES))
+            .values(stop_requested=True)
+        )
+        db.commit()
+
+        deadline = time.monotonic() + wait_seconds
+        while time.monotonic() < deadline:
+            time.sleep(DRONE_HEARTBEAT_SECONDS / 4)
+            db.expire_all()
+            if not self.is_alive(db.get(DroneRun, name)):
+                return "stopped"
+        return "stopping"
+
+    def status(self, db, name):
+        run = db.get(DroneRun, name)
+        is_running = self.is_alive(run)
+        if run is None:
+            state = "stopped"
+        elif run.status in LIVE_STATUSES and not is_running:
+            # The owning worker stopped heartbeating (crashed or lost its database connection)
+            state = "lost"
+        else:
+            state = run.status
+        return {
+            "is_running": is_running,
+            "process_id": run.pid if is_running else None,
+            "status": state,
+            "owner": run.owner if is_running else None,
+            "started_at": run.started_at if run else None,
+            "heartbeat_at": run.heartbeat_at if run else None,
+            "exit_code": run.exit_code if run else None
+        }
+
+    def _ensure_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread and self._heartbeat_thread.is_alive():
+                return
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._shutdown.wait(DRONE_HEARTBEAT_SECONDS):
+            with self._lock:
+                owned = dict(self.processes)
+            if not owned:
+                continue
+            db = SessionLocal()
+            try:
+                for name, process in owned.items():
+                    self._check(db, name, process)
+            except Exception as e:
+                print(f"⚠️ Drone heartbeat error: {e}")
+            finally:
+                db.close()
+
+    def _forget(self, name, process):
+        with self._lock:
+            if self.processes.get(name) is process:
+                del self.processes[name]
+
+    def _check(self, db, name, process):
+        exit_code = process.poll()
+        if exit_code is not None:
+            self._forget(name, process)
+            self._mark_stopped(db, name, "stopped" if exit_code == 0 else "crashed", exit_code)
+            print(f"🛑 Drone run {name} exited with code {exit_code}")
+            return
+
+        run = db.get(DroneRun, name)
+        if run is None or run.owner != self.worker_id:
+            # Our heartbeat went stale and another worker took the run over
+            print(f"⚠️ Lost ownership of drone run {name}, stopping local process")
+            self._forget(name, process)
+            terminate_process(process)
+            return
+
+        if run.stop_requested:
+            self._forget(name, process)
+            terminate_process(process)
+            self._mark_stopped(db, name, exit_code=process.returncode)
+            print(f"🛑 Drone run {name} stopped on request")
+            return
+
+        self.update_owned(db, name, heartbeat_at=utcnow())
+
+    def shutdown(self):
+        """Stop every process this worker owns, e.g. on API shutdown."""
+        self._shutdown.set()
+        with self._lock:
+            owned = dict(self.processes)
+            self.processes.clear()
+        if not owned:
+            return
+        db = SessionLocal()
+        try:
+            for name, process in owned.items():
+                terminate_process(process)
+                self._mark_stopped(db, name, exit_code=process.returncode)
+        finally:
+            db.close()
+
+drone_controller = DroneController()
@@ -0,0 +1,158 @@
+import os
+import asyncio
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Output of vision agents started by the backend, one rotating file per run name
+DRONE_LOG_DIR = Path(os.getenv("DRONE_LOG_DIR", Path(__file__).parent / "logs"))
+DRONE_LOG_MAX_BYTES = int(os.getenv("DRONE_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+DRONE_LOG_BACKUPS = int(os.getenv("DRONE_LOG_BACKUPS", "3"))
+DRONE_LOG_BUFFER_LINES = int(os.getenv("DRONE_LOG_BUFFER_LINES", "1000"))
+
+SSE_POLL_SECONDS = 0.5
+SSE_KEEPALIVE_SECONDS = 15
+
+def log_path(name):
+    return DRONE_LOG_DIR / f"{name}.log"
+
+def logged_popen_kwargs():
+    """Popen arguments for a vision agent whose output is drained by ProcessLog."""
+    return dict(
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        bufsize=1,
+        env={**os.environ, "PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"},
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    )
+
+class ProcessLog:
+    """
+    Drains a subprocess's output (stderr merged into stdout) on a reader
+    thread, so the pipe never fills up and blocks the process. Lines go to
+    an in-memory ring buffer and a rotating log file.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lines = deque(maxlen=DRONE_LOG_BUFFER_LINES)
+
+        DRONE_LOG_DIR.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(f"drone.{name}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(
+                log_path(name), maxBytes=DRONE_LOG_MAX_BYTES, backupCount=DRONE_LOG_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    def write(self, line):
+        line = f"{datetime.now():%Y-%m-%d %H:%M:%S} {line}"
+        self.lines.append(line)
+        self.logger.info(line)
+
+    def attach(self, process, on_line=None):
+        """
+        Start draining `process.stdout` (opened with text=True) in a daemon thread.
+        `on_line(line)` is called for every line, e.g. to parse STATS lines.
+        """
+        self.write(f"--- started pid {process.pid} ---")
+        thread = threading.Thread(target=self._drain, args=(process, on_line), daemon=True)
+        thread.start()
+        return thread
+
+    def _drain(self, process, on_line):
+        for line in iter(process.stdout.readline, ""):
+            line = line.rstrip("\n")
+            self.write(line)
+            if on_line:
+                try:
+                    on_line(line)
+                except Exception as e:
+                    print(f"⚠️ Log line handler error for {self.name}: {e}")
+        process.stdout.close()
+        self.write(f"--- exited with code {process.wait()} ---")
+
+    def tail(self, count):
+        return list(self.lines)[-count:]
+
+_process_logs = {}
+_process_logs_lock = threading.Lock()
+
+def get_process_log(name):
+    with _process_logs_lock:
+        if name not in _process_logs:
+            _process_logs[name] = ProcessLog(name)
+        return _process_logs[name]
+
+def tail_file(path, count, block_size=8192):
+    """Last `count` lines of a text file, reading backwards from the end."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+    except FileNotFoundError:
+        return []
+    return data.decode("utf-8", errors="replace").splitlines()[-count:]
+
+async def follow_log(name, request, backlog=50):
+    """
+    Server-sent events for the run's log file: the last `backlog` lines, then
+    new lines as they're written. Reads the file rather than the ring buffer,
+    so it works from any API worker on the node, and survives rotation.
+    """
+    path = log_path(name)
+    for line in tail_file(path, backlog):
+        yield f"data: {line}\n\n"
+
+    f = None
+    inode = None
+    idle = 0.0
+    try:
+        while not await request.is_disconnected():
+            if f is None and path.exists():
+                f = open(path, "r", encoding="utf-8", errors="replace")
+                inode = os.fstat(f.fileno()).st_ino
+                f.seek(0, os.SEEK_END)
+
+            lines = f.readlines() if f else []
+            for line in lines:
+                yield f"data: {line.rstrip()}\n\n"
+
+            if not lines:
+                # Rotated (new file at the path) or truncated: reopen from the start
+                try:
+                    stat = os.stat(path)
+                    if f and (stat.st_ino != inode or stat.st_size < f.tell()):
+                        f.close()
+                        f = open(path, "r", encoding="utf-8", errors="replace")
+                        inode = os.fstat(f.fileno()).st_ino
+                        continue
+                except FileNotFoundError:
+                    pass
+
+                idle += SSE_POLL_SECONDS
+                if idle >= SSE_KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+                await asyncio.sleep(SSE_POLL_SECONDS)
+            else:
+                idle = 0.0
+    finally:
+        if f:
+            f.close()
@@ -1,18 +1,18 @@
-import resend
 import base64
 import os
+from metrics import stage_timer
 
 def send_alert(defect_data, recipient_email=None, station_name=None):
     """
     Sends an email alert using Resend API to bypass Render SMTP blocks.
     """
-    resend.api_key = os.getenv("RESEND_API_KEY")
+    api_key = os.getenv("RESEND_API_KEY")
     
     # Use provided recipient or fall back to env variable
     if not recipient_email:
         recipient_email = os.getenv("ALERT_RECIPIENT")
 
-    if not resend.api_key:
+    if not api_key:
         print("✗ RESEND_API_KEY not set. Skipping email.")
         return
     
@@ -68,8 +68,10 @@ def send_alert(defect_data, recipient_email=None, station_name=None):
     </html>
     """
 
-    # 3. Send via Resend
+    # 3. Send via Resend (imported on first send to keep startup fast)
     try:
+        import resend
+        resend.api_key = api_key
         params = {
             "from": "Railway Monitor <onboarding@resend.dev>",
             "to": [recipient_email],
@@ -78,7 +80,8 @@ def send_alert(defect_data, recipient_email=None, station_name=None):
             "attachments": attachments
         }
         
-        email = resend.Emails.send(params)
+        with stage_timer("email_send"):
+            email = resend.Emails.send(params)
         print(f"✓ Alert email sent successfully via Resend. ID: {email['id']}")
     except Exception as e:
         print(f"✗ Resend API error: {e}")
@@ -0,0 +1,217 @@
+import os
+import re
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+
+from sqlalchemy import update
+
+from database import DroneRun, SessionLocal
+from drone_control import drone_controller, utcnow, DRONE_STOP_WAIT_SECONDS
+from drone_logs import get_process_log, logged_popen_kwargs
+
+FLEET_MAX_WORKERS = int(os.getenv("FLEET_MAX_WORKERS", "16"))
+FLEET_RESTART_BACKOFF_SECONDS = float(os.getenv("FLEET_RESTART_BACKOFF_SECONDS", "1"))
+FLEET_RESTART_BACKOFF_MAX_SECONDS = float(os.getenv("FLEET_RESTART_BACKOFF_MAX_SECONDS", "60"))
+# A worker that ran at least this long before crashing restarts with the initial backoff again
+FLEET_STABLE_SECONDS = float(os.getenv("FLEET_STABLE_SECONDS", "60"))
+FLEET_POLL_SECONDS = 1.0
+
+RUN_PREFIX = "fleet-"
+VISION_AGENT_PATH = Path(__file__).parent.parent / "vision" / "vision_agent.py"
+WORKER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+def run_name(worker_id):
+    return RUN_PREFIX + worker_id
+
+def agent_command(config):
+    command = [
+        sys.executable, str(VISION_AGENT_PATH), "--mode", "drone",
+        "--source", str(config["source"]),
+        "--lat", str(config["latitude"]),
+        "--lon", str(config["longitude"]),
+        "--worker-id", config["worker_id"]
+    ]
+    if config.get("loop"):
+        command.append("--loop")
+    return command
+
+class SupervisedWorker:
+    def __init__(self, config):
+        self.config = config
+        self.name = run_name(config["worker_id"])
+        self.restarts = 0
+        self.backoff = FLEET_RESTART_BACKOFF_SECONDS
+        self.started_at = 0.0
+        self.restart_at = None
+        self.stats = None
+        self.stats_dirty = False
+
+class FleetSupervisor:
+    """
+    Runs N vision agents, each with its own source and location, as drone
+    runs named fleet-<worker_id> (shared state and heartbeats come from
+    drone_control.py). The API worker that launched a fleet worker restarts
+    it with exponential backoff after a crash and stores its latest STATS
+    line in drone_runs, so any API worker can report fleet status.
+    """
+
+    def __init__(self):
+        self.workers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shutdown = threading.Event()
+
+    def _launch(self, db, worker):
+        process = drone_controller.start(db, worker.name, agent_command(worker.config), **logged_popen_kwargs())
+        if process is None:
+            return None
+        get_process_log(worker.name).attach(process, on_line=lambda line: self._on_line(worker, line))
+        worker.started_at = time.monotonic()
+        drone_controller.update_owned(
+            db, worker.name, config=json.dumps(worker.config), restarts=worker.restarts, stats=None
+        )
+        return process
+
+    def _on_line(self, worker, line):
+        if line.startswith("STATS "):
+            worker.stats = {**json.loads(line[len("STATS "):]), "updated_at": utcnow().isoformat(timespec="seconds")}
+            worker.stats_dirty = True
+
+    def start(self, db, configs):
+        """Launch workers in this API process. Returns (started_ids, already_running_ids)."""
+        started, already_running = [], []
+        for config in configs:
+            worker = SupervisedWorker(config)
+            if self._launch(db, worker) is None:
+                already_running.append(config["worker_id"])
+                continue
+            with self._lock:
+                self.workers[worker.name] = worker
+            started.append(config["worker_id"])
+        self._ensure_thread()
+        return started, already_running
+
+    def stop(self, db, wait_seconds=DRONE_STOP_WAIT_SECONDS):
+        """Stop every fleet worker wherever it runs. Returns {worker_id: "stopped" | "stopping"}."""
+        # Crashed workers waiting for a restart have no process; stopping them cancels the restart
+        db.execute(
+            update(DroneRun)
+            .where(DroneRun.name.like(RUN_PREFIX + "%"), DroneRun.status == "crashed")
+            .values(status="stopped", stopped_at=utcnow())
+        )
+        db.commit()
+
+        results = {}
+        for run in db.query(DroneRun).filter(DroneRun.name.like(RUN_PREFIX + "%")).all():
+            with self._lock:
+                self.workers.pop(run.name, None)
+            # Request every stop first, then wait for all of them together
+            result = drone_controller.stop(db, run.name, wait_seconds=0)
+            if result:
+                results[run.name[len(RUN_PREFIX):]] = result
+
+        deadline = time.monotonic() + wait_seconds
+        while "stopping" in results.values() and time.monotonic() < deadline:
+            time.sleep(0.5)
+            db.expire_all()
+            for worker_id, result in results.items():
+                if result == "stopping" and not drone_controller.is_alive(db.get(DroneRun, run_name(worker_id))):
+                    results[worker_id] = "stopped"
+        return results
+
+    def status(self, db):
+        workers = []
+        for run in db.query(DroneRun).filter(DroneRun.name.like(RUN_PREFIX + "%")).order_by(DroneRun.name).all():
+            stats = json.loads(run.stats) if run.stats else {}
+            workers.append({
+                "worker_id": run.name[len(RUN_PREFIX):],
+                **drone_controller.status(db, run.name),
+                "config": json.loads(run.config) if run.config else None,
+                "restarts": run.restarts or 0,
+                "fps": stats.get("fps"),
+                "frames": stats.get("frames"),
+                "detections": stats.get("detections"),
+                "duplicates": stats.get("duplicates"),
+                "rejected": stats.get("rejected"),
+                "cache_hits": stats.get("cache_hits"),
+                "errors": stats.get("errors"),
+                "backend_errors": stats.get("backend_errors"),
+                "busy_workers": stats.get("busy_workers"),
+                "dropped_frames": stats.get("dropped"),
+                "sample_interval": stats.get("interval"),
+                "stats_updated_at": stats.get("updated_at")
+            })
+        running = [w for w in workers if w["is_running"]]
+        return {
+            "workers": workers,
+            "total": len(workers),
+            "running": len(running),
+            "fps": round(sum(w["fps"] or 0 for w in running), 2),
+            "detections": sum(w["detections"] or 0 for w in workers)
+        }
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._supervise_loop, daemon=True)
+            self._thread.start()
+
+    def _supervise_loop(self):
+        while not self._shutdown.wait(FLEET_POLL_SECONDS):
+            with self._lock:
+                workers = list(self.workers.values())
+            if not workers:
+                continue
+            db = SessionLocal()
+            try:
+                for worker in workers:
+                    self._supervise(db, worker)
+            except Exception as e:
+                print(f"⚠️ Fleet supervisor error: {e}")
+            finally:
+                db.close()
+
+    def _forget(self, worker):
+        with self._lock:
+            if self.workers.get(worker.name) is worker:
+                del self.workers[worker.name]
+
+    def _supervise(self, db, worker):
+        if worker.name in drone_controller.processes:
+            if worker.stats_dirty:
+                worker.stats_dirty = False
+                drone_controller.update_owned(db, worker.name, stats=json.dumps(worker.stats))
+            return
+
+        # The process is gone; drone_controller has recorded how it ended
+        run = db.get(DroneRun, worker.name)
+        if run is None or run.owner != drone_controller.worker_id or run.status == "stopped":
+            self._forget(worker)
+            return
+        if run.status != "crashed":
+            return
+
+        now = time.monotonic()
+        if worker.restart_at is None:
+            if now - worker.started_at >= FLEET_STABLE_SECONDS:
+                worker.backoff = FLEET_RESTART_BACKOFF_SECONDS
+            worker.restart_at = now + worker.backoff
+            print(f"⚠️ Fleet worker {worker.config['worker_id']} crashed (exit {run.exit_code}), "
+                  f"restarting in {worker.backoff:.0f}s")
+            worker.backoff = min(worker.backoff * 2, FLEET_RESTART_BACKOFF_MAX_SECONDS)
+        elif now >= worker.restart_at:
+            worker.restart_at = None
+            worker.restarts += 1
+            if self._launch(db, worker) is None:
+                # Someone else started it in the meantime
+                self._forget(worker)
+
+    def shutdown(self):
+        """Stop restarting workers; drone_controller.shutdown() stops the processes."""
+        self._shutdown.set()
+
+fleet_supervisor = FleetSupervisor()
@@ -1,6 +1,7 @@
 import os
 import json
-from groq import Groq
+import re
+from metrics import stage_timer
 
 # Initialize Groq Client
 client = None
@@ -12,9 +13,30 @@ def get_client():
         if not api_key:
             print("❌ GROQ_API_KEY not found in environment variables!")
             return None
+        # Imported on first use; the SDK is slow to import and not needed at startup
+        from groq import Groq
         client = Groq(api_key=api_key)
     return client
 
+def parse_analysis(response_content):
+    """
+    Parses the JSON analysis out of a Groq completion.
+    Raises ValueError if no valid JSON object is found.
+    """
+    # Basic Cleanup if model ignores system prompt
+    text = response_content.strip()
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        text = match.group(0)
+    
+    analysis = json.loads(text)
+    
+    # Ensure Severity is Capitalized
+    if "severity" in analysis:
+        analysis["severity"] = analysis["severity"].capitalize()
+
+    return analysis
+
 def analyze_defect(defect_type, confidence, location_info):
     """
     Uses Groq (Llama3-8b or similar) to analyze the defect.
@@ -48,39 +70,27 @@ def analyze_defect(defect_type, confidence, location_info):
     """
 
     try:
-        completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful AI assistant that outputs only valid JSON strings."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
+        with stage_timer("groq_call"):
+            completion = client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful AI assistant that outputs only valid JSON strings."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
 
         response_content = completion.choices[0].message.content
         print(f"Groq Response: {response_content}")
 
-        # Basic Cleanup if model ignores system prompt
-        text = response_content.strip()
-        import re
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            text = match.group(0)
-        
-        analysis = json.loads(text)
-        
-        # Ensure Severity is Capitalized
-        if "severity" in analysis:
-            analysis["severity"] = analysis["severity"].capitalize()
-
-        return analysis
+        return parse_analysis(response_content)
 
     except Exception as e:
         print(f"Error calling Groq API: {e}")
@@ -0,0 +1,145 @@
+import os
+import json
+import uuid
+import time
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from database import IdempotencyRecord, SessionLocal
+
+# Clients retry ingest calls freely; a repeated Idempotency-Key within the TTL
+# gets the original response instead of a second defect row and Groq call.
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+IDEMPOTENCY_WAIT_SECONDS = 60
+# A request still marked in flight after this long died with its worker; its key is freed
+IDEMPOTENCY_PENDING_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT_SECONDS", "300"))
+IDEMPOTENCY_POLL_SECONDS = 0.2
+MAX_KEY_LENGTH = 255
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class IdempotencyStore:
+    """
+    TTL-limited map of (scope, key) to the response of the first request,
+    kept in the idempotency_keys table so every API worker and node sees it.
+    Only successful responses are kept; a failed request frees its key so the
+    client can retry it. Expired keys are pruned only once completed, or once
+    their request is considered dead (IDEMPOTENCY_PENDING_TIMEOUT_SECONDS).
+    """
+
+    def __init__(self, ttl_seconds=IDEMPOTENCY_TTL_SECONDS, pending_timeout_seconds=IDEMPOTENCY_PENDING_TIMEOUT_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.pending_timeout_seconds = pending_timeout_seconds
+        self._last_prune = 0.0
+
+    def _stale(self, now):
+        """Completed records past their TTL and in-flight records whose request died."""
+        return or_(
+            and_(IdempotencyRecord.response.isnot(None), IdempotencyRecord.expires_at <= now),
+            and_(
+                IdempotencyRecord.response.is_(None),
+                IdempotencyRecord.created_at <= now - timedelta(seconds=self.pending_timeout_seconds)
+            )
+        )
+
+    def _prune(self, db, now):
+        if time.monotonic() - self._last_prune < 60:
+            return
+        self._last_prune = time.monotonic()
+        db.execute(delete(IdempotencyRecord).where(self._stale(now)))
+        db.commit()
+
+    def _begin(self, db, scope, key, fingerprint):
+        """Returns (record, owner token or None)."""
+        now = utcnow()
+        self._prune(db, now)
+        db.execute(delete(IdempotencyRecord).where(
+            IdempotencyRecord.scope == scope, IdempotencyRecord.key == key, self._stale(now)
+        ))
+        token = uuid.uuid4().hex
+        record = IdempotencyRecord(
+            scope=scope, key=key, fingerprint=fingerprint, owner=token,
+            created_at=now, expires_at=now + timedelta(seconds=self.ttl_seconds)
+        )
+        try:
+            db.add(record)
+            db.commit()
+            return record, token
+        except IntegrityError:
+            # Another request (maybe on another worker) holds the key
+            db.rollback()
+        return db.get(IdempotencyRecord, (scope, key), populate_existing=True), None
+
+    def _finish(self, scope, key, token, result):
+        with SessionLocal() as db:
+            if result is None:
+                db.execute(delete(IdempotencyRecord).where(
+                    IdempotencyRecord.scope == scope, IdempotencyRecord.key == key,
+                    IdempotencyRecord.owner == token
+                ))
+            else:
+                db.execute(update(IdempotencyRecord).where(
+                    IdempotencyRecord.scope == scope, IdempotencyRecord.key == key,
+                    IdempotencyRecord.owner == token
+                ).values(response=json.dumps(result)))
+            db.commit()
+
+    async def run(self, scope, key, fingerprint, handler):
+        """
+        Run `handler()` (an async callable returning a JSON-serializable result)
+        at most once per (scope, key).
+        Returns (result, replayed).
+        """
+        if not key:
+            return await handler(), False
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+
+        fingerprint = hashlib.sha256(fingerprint.encode()).hexdigest()
+        with SessionLocal() as db:
+            while True:
+                record, token = self._begin(db, scope, key, fingerprint)
+                if token is not None:
+                    break
+                if record is None:
+                    # Freed between our insert and read; try again as owner
+                    continue
+
+                if record.fingerprint != fingerprint:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Idempotency-Key was already used with a different request body"
+                    )
+
+                # Same request still in flight (e.g. a double-click); wait for its outcome
+                deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+                while record is not None and record.response is None and time.monotonic() < deadline:
+                    await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+                    record = db.get(IdempotencyRecord, (scope, key), populate_existing=True)
+                    db.commit()
+                if record is not None and record.response is None:
+                    raise HTTPException(
+                        status_code=409,
+                        detail="A request with this Idempotency-Key is still in progress"
+                    )
+
+                if record is not None:
+                    return json.loads(record.response), True
+                # The original request failed and freed the key; try again as owner
+
+        try:
+            result = await handler()
+        except BaseException:
+            self._finish(scope, key, token, None)
+            raise
+
+        self._finish(scope, key, token, result)
+        return result, False
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,48 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
+# "remote" calls the hosted model API; "local" runs an ONNX export of the
+# classifier in-process on the CPU (ONNX Runtime, or OpenCV DNN without it)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "remote")
+MODEL_API_URL = os.getenv("MODEL_API_URL", "https://vishalbhagat01-railway.hf.space/predict")
+MODEL_PATH = os.getenv("MODEL_PATH", "models/track_classifier.onnx")
+MODEL_LABELS = os.getenv("MODEL_LABELS", "Defective,Non Defective").split(",")
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", "224"))
+MODEL_NORMALIZE = os.getenv("MODEL_NORMALIZE", "imagenet")  # imagenet | unit (0-1 only)
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", "2"))
+MODEL_OUTPUT = os.getenv("MODEL_OUTPUT", "logits")  # logits | probs
+
+# The model code is shared with the vision agent and imported as the
+# `vision` package (vision/inference.py, vision/prediction_cache.py)
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+_local_model = None
+_local_model_lock = threading.Lock()
+
+def get_local_model():
+    """The vision agent's LocalBackend for MODEL_PATH, loaded on first use."""
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            # numpy/cv2/onnxruntime are only imported when the local backend is used
+            from vision.inference import LocalBackend
+            _local_model = LocalBackend(
+                MODEL_PATH, MODEL_LABELS, MODEL_INPUT_SIZE, MODEL_NORMALIZE, MODEL_THREADS,
+                max_batch_size=1, output=MODEL_OUTPUT
+            )
+        return _local_model
+
+def predict(contents):
+    """{"prediction", "confidence"} for an encoded image, from the configured MODEL_BACKEND."""
+    if MODEL_BACKEND == "local":
+        return get_local_model().predict(contents)
+    if MODEL_BACKEND != "remote":
+        raise ValueError(f"Unknown MODEL_BACKEND {MODEL_BACKEND!r}, expected 'remote' or 'local'")
+
+    import requests
+    response = requests.post(MODEL_API_URL, files={'file': ('image.jpg', contents, 'image/jpeg')}, timeout=30)
+    return response.json()
@@ -1,4 +1,5 @@
 import math
+from metrics import stage_timer
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
@@ -23,15 +24,16 @@ def haversine_distance(lat1, lon1, lat2, lon2):
 def find_nearest_station(defect_lat, defect_lon, db):
     """
     Find the nearest station to a defect location.
-    Returns the Station object.
+    Returns a cached station (id, name, code, latitude, longitude,
+    station_master_email) or None.
     """
-    from database import Station
-    
-    stations = db.query(Station).all()
-    
-    if not stations:
-        return None
+    from station_cache import station_cache
     
+    with stage_timer("station_lookup"):
+        return nearest_station_among(defect_lat, defect_lon, station_cache.stations(db))
+
+def nearest_station_among(defect_lat, defect_lon, stations):
+    """Nearest of an already loaded list of stations, or None if the list is empty."""
     nearest_station = None
     min_distance = float('inf')
     
@@ -46,3 +48,245 @@ def find_nearest_station(defect_lat, defect_lon, db):
             nearest_station = station
     
     return nearest_station
+
+def find_nearest_stations(points, db, chunk_size=2048):
+    """
+    Find the nearest station for many (latitude, longitude) points at once.
+    Uses the cached station list and computes all distances with numpy.
+    Returns a list of cached stations (or None) in the same order as `points`.
+    """
+    from station_cache import station_cache
+
+    if not points:
+        return []
+
+    with stage_timer("station_lookup"):
+        return nearest_stations_among(points, station_cache.stations(db), chunk_size)
+
+def nearest_stations_among(points, stations, chunk_size=2048):
+    """Vectorized core of find_nearest_stations for an already loaded station list."""
+    import numpy as np
+
+    if not stations:
+        return [None] * len(points)
+
+    station_coords = np.radians(np.array([(s.latitude, s.longitude) for s in stations], dtype=float))
+    station_lat = station_coords[:, 0][None, :]
+    station_lon = station_coords[:, 1][None, :]
+    cos_station_lat = np.cos(station_lat)
+
+    nearest = []
+    # Chunk the points so the distance matrix stays small for big batches
+    for start in range(0, len(points), chunk_size):
+        chunk = np.radians(np.array(points[start:start + chunk_size], dtype=float))
+        point_lat = chunk[:, 0][:, None]
+        point_lon = chunk[:, 1][:, None]
+        # Haversine "a" term; it grows monotonically with distance, so argmin is enough
+        a = np.sin((station_lat - point_lat) / 2) ** 2 + \
+            np.cos(point_lat) * cos_station_lat * np.sin((station_lon - point_lon) / 2) ** 2
+        nearest.extend(int(i) for i in np.argmin(a, axis=1))
+
+    return [stations[i] for i in nearest]
+
+# Geohash / map tile helpers
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+DEFECT_GEOHASH_PRECISION = 9  # ~5m cells, stored on every defect
+KM_PER_DEGREE_LAT = 111.32
+
+def geohash_encode(latitude, longitude, precision=9):
+    """
+    Encode a coordinate as a geohash string of the given precision.
+    Neighbouring points share a common prefix, so prefixes work as grid cells.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits = bits << 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+def geohash_bounds(geohash):
+    """
+    Returns (min_lat, min_lon, max_lat, max_lon) of a geohash cell.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def geohash_precision_for_zoom(zoom):
+    """
+    Pick a geohash precision whose cells are roughly a few screen pixels
+    wide at the given web map zoom level.
+    """
+    if zoom <= 2:
+        return 1
+    if zoom <= 4:
+        return 2
+    if zoom <= 7:
+        return 3
+    if zoom <= 9:
+        return 4
+    if zoom <= 12:
+        return 5
+    if zoom <= 14:
+        return 6
+    if zoom <= 17:
+        return 7
+    return 8
+
+def tile_bounds(zoom, x, y):
+    """
+    Returns (min_lat, min_lon, max_lat, max_lon) of a slippy map tile
+    (the z/x/y scheme used by Leaflet and OpenStreetMap).
+    """
+    n = 2 ** zoom
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lon, max_lat, max_lon
+
+def defect_geohash(latitude, longitude):
+    """Geohash stored on a defect row, or None when the location is unknown."""
+    if latitude is None or longitude is None:
+        return None
+    return geohash_encode(latitude, longitude, DEFECT_GEOHASH_PRECISION)
+
+def geohash_cells_for_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=24):
+    """
+    Returns the geohash prefixes covering a bounding box, using the finest
+    precision that needs at most `max_cells` prefixes.
+    """
+    cells = None
+    for precision in range(1, DEFECT_GEOHASH_PRECISION + 1):
+        cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon = geohash_bounds("0" * precision)
+        cell_height = cell_max_lat - cell_min_lat
+        cell_width = cell_max_lon - cell_min_lon
+        rows = int((max_lat - min_lat) / cell_height) + 2
+        cols = int((max_lon - min_lon) / cell_width) + 2
+        if rows * cols > max_cells:
+            break
+
+        covering = set()
+        lat = min_lat
+        while True:
+            lon = min_lon
+            while True:
+                covering.add(geohash_encode(lat, lon, precision))
+                if lon >= max_lon:
+                    break
+                lon = min(lon + cell_width, max_lon)
+            if lat >= max_lat:
+                break
+            lat = min(lat + cell_height, max_lat)
+        cells = covering
+
+    # Box too large for even single character cells to help
+    return sorted(cells) if cells else []
+
+def _geohash_prefix_filter(prefixes):
+    """SQL filter matching defects whose geohash starts with any of the prefixes."""
+    from sqlalchemy import and_, or_
+    from database import DATABASE_URL, Defect
+
+    # PostgreSQL orders text by the database collation, where the bumped
+    # upper bound (':' after '9') can sort anywhere; LIKE uses the
+    # text_pattern_ops index instead (geohash characters are never wildcards)
+    if DATABASE_URL.startswith("postgresql"):
+        return or_(*[Defect.geohash.like(prefix + "%") for prefix in prefixes])
+
+    # SQLite compares bytes, and its LIKE is case-insensitive so it can't use the index
+    return or_(*[
+        and_(Defect.geohash >= prefix, Defect.geohash < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        for prefix in prefixes
+    ])
+
+def query_defects_in_bbox(db, min_lat, min_lon, max_lat, max_lon, query=None):
+    """
+    Query defects inside a bounding box.
+    Narrows by geohash prefix first (indexed) and then applies the exact bounds.
+    Pass `query` to select specific columns or add extra filters.
+    """
+    from database import Defect
+
+    if query is None:
+        query = db.query(Defect)
+
+    prefixes = geohash_cells_for_bbox(min_lat, min_lon, max_lat, max_lon)
+    if prefixes:
+        query = query.filter(_geohash_prefix_filter(prefixes))
+
+    return query.filter(
+        Defect.latitude >= min_lat,
+        Defect.latitude <= max_lat,
+        Defect.longitude >= min_lon,
+        Defect.longitude <= max_lon
+    )
+
+def find_defects_within_radius(db, latitude, longitude, radius_km, query=None):
+    """
+    Find defects within `radius_km` of a point.
+    Returns a list of (defect, distance_km) tuples, nearest first.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    lon_delta = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+
+    candidates = query_defects_in_bbox(
+        db,
+        max(latitude - lat_delta, -90.0),
+        max(longitude - lon_delta, -180.0),
+        min(latitude + lat_delta, 90.0),
+        min(longitude + lon_delta, 180.0),
+        query=query
+    ).all()
+
+    # Exact haversine refinement removes the corners of the bounding box
+    matches = []
+    for defect in candidates:
+        distance = haversine_distance(latitude, longitude, defect.latitude, defect.longitude)
+        if distance <= radius_km:
+            matches.append((defect, distance))
+
+    matches.sort(key=lambda match: match[1])
+    return matches
@@ -1,34 +1,48 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, status, UploadFile, File, Header, Request, Response, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
 load_dotenv()
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
+from sqlalchemy import text, func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timedelta
-import subprocess
 import os
+import hashlib
+import time
 from pathlib import Path
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-import pytz
 import database
 from database import Defect, SessionLocal, User, Station
 import groq_service
 import email_service
+import inference
+from prediction_cache import cached_predict
 import auth
-from location_utils import find_nearest_station
+from location_utils import (
+    find_nearest_station, find_nearest_stations, defect_geohash, geohash_encode, geohash_precision_for_zoom, tile_bounds,
+    query_defects_in_bbox, find_defects_within_radius
+)
+from tile_cache import tile_cache
+from station_cache import station_cache
+from dedup import detection_index, DEDUP_PENDING_TIMEOUT_SECONDS
+from idempotency import idempotency_store
+from search import search_defects
+from drone_control import drone_controller
+from fleet import fleet_supervisor, FLEET_MAX_WORKERS, WORKER_ID_PATTERN, VISION_AGENT_PATH
+from drone_logs import get_process_log, tail_file, log_path, follow_log, logged_popen_kwargs
+from archive import ARCHIVE_AFTER_DAYS, archive_resolved_defects, load_archived_defects, archived_counts
+from metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, stage_timer, instrument_sessions, render_metrics
 
 app = FastAPI(title="Railway Defect Detection System")
 
 # OAuth2 scheme for JWT
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 # CORS Setup
 app.add_middleware(
@@ -39,6 +53,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency instrumentation
+def route_template(scope):
+    """Route path (e.g. /defects/{defect_id}) for metric labels, so ids don't explode label cardinality."""
+    from starlette.routing import Match
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    route = route_template(request.scope)
+    method = request.method
+    REQUESTS_IN_FLIGHT.inc(method=method, route=route)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec(method=method, route=route)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, method=method, route=route, status=status_code)
+
+instrument_sessions(SessionLocal)
+
 # Mount static files for images
 uploads_dir = Path(__file__).parent / "uploads"
 uploads_dir.mkdir(exist_ok=True)
@@ -52,43 +93,82 @@ def get_db():
     finally:
         db.close()
 
+# One-time startup work (schema migration, PostgreSQL sequence resync, admin seeding)
+# is recorded in app_meta and skipped on later boots until the schema changes.
+# SKIP_STARTUP_TASKS=true skips it entirely, e.g. when a release step already ran
+# `python main.py --startup-tasks`; FORCE_STARTUP_TASKS=true re-runs it on every boot.
+SKIP_STARTUP_TASKS = os.getenv("SKIP_STARTUP_TASKS", "false").lower() == "true"
+FORCE_STARTUP_TASKS = os.getenv("FORCE_STARTUP_TASKS", "false").lower() == "true"
+
+def run_startup_tasks(force=False):
+    """Migrate the schema, resync sequences and seed the admin. Returns False if skipped."""
+    db = SessionLocal()
+    try:
+        if not force and database.startup_tasks_done(db):
+            print("✅ Startup tasks already ran for this schema, skipping")
+            return False
+
+        database.init_db()
+        try:
+            if database.DATABASE_URL.startswith("postgresql"):
+                resync_sql = """
+                SELECT setval(pg_get_serial_sequence('stations', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM stations;
+                SELECT setval(pg_get_serial_sequence('users', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM users;
+                SELECT setval(pg_get_serial_sequence('defects', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM defects;
+                """
+                for statement in resync_sql.strip().split(';'):
+                    if statement.strip():
+                        db.execute(text(statement))
+                db.commit()
+                print("✅ ID sequences resynced for PostgreSQL")
+            
+            admin_exists = db.query(User).filter(User.role == "Admin").first()
+            if not admin_exists:
+                print("🚀 No Admin found in PostgreSQL. Seeding default Admin...")
+                from auth import get_password_hash
+                admin = User(
+                    username="admin",
+                    email="kush85114@gmail.com",
+                    hashed_password=get_password_hash("admin123"), # You can change this
+                    role="Admin"
+                )
+                db.add(admin)
+                db.commit()
+                print("✅ Default Admin created: admin / admin123")
+
+            database.mark_startup_tasks_done(db)
+        except Exception as e:
+            print(f"❌ Seeding error: {e}")
+        return True
+    finally:
+        db.close()
+
 # Initialize API
 @app.on_event("startup")
 def startup():
-    database.init_db()
+    if SKIP_STARTUP_TASKS:
+        print("⏭️ SKIP_STARTUP_TASKS set, skipping migrations and seeding")
+    else:
+        run_startup_tasks(force=FORCE_STARTUP_TASKS)
+
+    # Per-process state, needed on every boot
     db = SessionLocal()
     try:
-        if database.DATABASE_URL.startswith("postgresql"):
-            resync_sql = """
-            SELECT setval(pg_get_serial_sequence('stations', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM stations;
-            SELECT setval(pg_get_serial_sequence('users', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM users;
-            SELECT setval(pg_get_serial_sequence('defects', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM defects;
-            """
-            for statement in resync_sql.strip().split(';'):
-                if statement.strip():
-                    db.execute(text(statement))
-            db.commit()
-            print("✅ ID sequences resynced for PostgreSQL")
-        
-        admin_exists = db.query(User).filter(User.role == "Admin").first()
-        if not admin_exists:
-            print("🚀 No Admin found in PostgreSQL. Seeding default Admin...")
-            from auth import get_password_hash
-            admin = User(
-                username="admin",
-                email="kush85114@gmail.com",
-                hashed_password=get_password_hash("admin123"), # You can change this
-                role="Admin"
-            )
-            db.add(admin)
-            db.commit()
-            print("✅ Default Admin created: admin / admin123")
-            
+        warmed = detection_index.load_recent(db)
+        if warmed:
+            print(f"✅ Dedup index warmed with {warmed} recent defects")
     except Exception as e:
-        print(f"❌ Seeding error: {e}")
+        print(f"❌ Dedup warm-up error: {e}")
     finally:
         db.close()
 
+    # Load the local model once per process rather than on the first upload
+    if inference.MODEL_BACKEND == "local":
+        try:
+            inference.get_local_model()
+        except Exception as e:
+            print(f"❌ Local model load error: {e}")
+
 # Auth Dependencies
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """Get the current authenticated user from JWT token."""
@@ -99,7 +179,8 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     
     payload = auth.decode_access_token(token)
-    if payload is None:
+    # Scoped stream tokens only open their stream
+    if payload is None or payload.get("scope"):
         raise credentials_exception
     
     username: str = payload.get("sub")
@@ -118,6 +199,28 @@ def require_admin(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+def require_admin_stream(
+    token: Optional[str] = Query(None),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """
+    Admin check for server-sent event streams. Browsers' EventSource can't send
+    an Authorization header, so a short-lived stream token (?token=) works too.
+    """
+    if not token:
+        if not bearer:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        return require_admin(get_current_user(bearer, db))
+
+    payload = auth.decode_access_token(token)
+    if payload is None or payload.get("scope") != auth.STREAM_TOKEN_SCOPE:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream token")
+    user = db.query(User).filter(User.username == payload.get("sub")).first()
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream token")
+    return require_admin(user)
+
 # Pydantic Models
 class UserLogin(BaseModel):
     username: str
@@ -184,6 +287,8 @@ class DefectResponse(DefectCreate):
     status: str
     resolved_at: Optional[datetime]
     resolved_by: Optional[int]
+    hit_count: Optional[int] = 1
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -208,15 +313,39 @@ def normalize_severity(severity_str):
     else:
         return "High"  # Default to High for unknown values
 
+def analysis_text(analysis, key, default):
+    """Groq sometimes returns lists instead of strings; flatten them for storage."""
+    value = analysis.get(key, default)
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    return str(value)
+
+def defect_alert_payload(db_defect):
+    """Fields of a stored defect used by email_service.send_alert."""
+    return {
+        "defect_type": db_defect.defect_type,
+        "confidence": db_defect.confidence,
+        "latitude": db_defect.latitude,
+        "longitude": db_defect.longitude,
+        "nearest_station": db_defect.nearest_station,
+        "timestamp": db_defect.timestamp,
+        "severity": db_defect.severity,
+        "action_required": db_defect.action_required,
+        "resolution_steps": db_defect.resolution_steps,
+        "image_url": db_defect.image_url
+    }
+
 # Web Upload Endpoint for Drone Control Page (Uses Vision Agent ML Pipeline)
 @app.post("/upload-analyze")
 async def upload_and_analyze(
+    response: Response,
     file: UploadFile = File(...),
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     background_tasks: BackgroundTasks = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Web upload endpoint that uses the same pipeline as vision_agent.py:
@@ -226,14 +355,31 @@ async def upload_and_analyze(
     
     Accepts optional latitude/longitude parameters for manual location input.
     Defaults to New Delhi (28.6139, 77.2090) if not provided.
+    Repeating an Idempotency-Key header returns the original result.
     """
+    contents = await file.read()
+    fingerprint = f"{hashlib.sha256(contents).hexdigest()}:{latitude}:{longitude}"
+    result, replayed = await idempotency_store.run(
+        f"upload-analyze:{current_user.id}",
+        idempotency_key,
+        fingerprint,
+        lambda: analyze_upload(contents, latitude, longitude, background_tasks, db)
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+def timed_model_call(contents: bytes):
+    with stage_timer("model_call"):
+        return inference.predict(contents)
+
+async def analyze_upload(contents: bytes, latitude, longitude, background_tasks, db: Session):
+    """Runs the /upload-analyze pipeline for an uploaded image."""
     try:
         import requests
         import io
         from PIL import Image
         
-        # Read file
-        contents = await file.read()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"web_upload_{timestamp}.jpg"
         upload_dir = "uploads"
@@ -241,20 +387,17 @@ async def upload_and_analyze(
         filepath = os.path.join(upload_dir, filename)
         
         # Save file
-        with open(filepath, "wb") as f:
-            f.write(contents)
+        with stage_timer("file_write"):
+            with open(filepath, "wb") as f:
+                f.write(contents)
         
-        # STEP 1: Call ML Model API (same as vision agent)
-        MODEL_API_URL = os.getenv("MODEL_API_URL", "https://vishalbhagat01-railway.hf.space/predict")
+        # STEP 1: Call ML Model (same as vision agent; remote API or local engine, see inference.py)
+        # Re-uploads of the same image are answered from the prediction cache
         CONFIDENCE_THRESHOLD = 70.0
         
-        
-        # Prepare file for ML model
-        files = {'file': ('image.jpg', contents, 'image/jpeg')}
-        
+        import asyncio
         try:
-            ml_response = requests.post(MODEL_API_URL, files=files, timeout=30)
-            ml_data = ml_response.json()
+            ml_data, _ = await asyncio.to_thread(cached_predict, contents, timed_model_call)
             
             prediction = ml_data.get("prediction", "Unknown")
             confidence = float(ml_data.get("confidence", 0))
@@ -289,7 +432,6 @@ async def upload_and_analyze(
             location_str = f"Lat: {location_data['latitude']}, Lon: {location_data['longitude']}, Station: {location_data['nearest_station']}"
             
             # Groq Analysis
-            import asyncio
             try:
                 analysis = await asyncio.to_thread(
                     groq_service.analyze_defect,
@@ -312,6 +454,7 @@ async def upload_and_analyze(
                 latitude=location_data["latitude"],
                 longitude=location_data["longitude"],
                 nearest_station=location_data["nearest_station"],
+                geohash=defect_geohash(location_data["latitude"], location_data["longitude"]),
                 severity=severity,
                 root_cause=str(analysis.get("root_cause", "Analysis pending")),
                 action_required=str(analysis.get("immediate_action", "Awaiting assessment")),
@@ -321,6 +464,7 @@ async def upload_and_analyze(
             db.add(db_defect)
             db.commit()
             db.refresh(db_defect)
+            tile_cache.invalidate()
             
             # Assign to nearest station
             nearest_station = find_nearest_station(
@@ -335,18 +479,7 @@ async def upload_and_analyze(
                 
                 # Send email if critical
                 if severity == "Critical" and background_tasks:
-                    defect_dict = {
-                        "defect_type": db_defect.defect_type,
-                        "confidence": db_defect.confidence,
-                        "latitude": db_defect.latitude,
-                        "longitude": db_defect.longitude,
-                        "nearest_station": db_defect.nearest_station,
-                        "timestamp": db_defect.timestamp,
-                        "severity": db_defect.severity,
-                        "action_required": db_defect.action_required,
-                        "resolution_steps": db_defect.resolution_steps,
-                        "image_url": db_defect.image_url
-                    }
+                    defect_dict = defect_alert_payload(db_defect)
                     background_tasks.add_task(
                         email_service.send_alert,
                         defect_dict,
@@ -381,45 +514,138 @@ async def upload_and_analyze(
         print(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def merge_repeat_detection(defect: DefectCreate, db: Session, pending_rows=None, commit=True, wait=True):
+    """
+    Merge a detection into a recent defect of the same type nearby.
+    Returns (merged_defect, None) on a match, or (None, reservation) when the
+    detection is new; the caller must confirm or release the reservation.
+    (None, None) means the match was still pending after
+    DEDUP_PENDING_TIMEOUT_SECONDS: store the detection without a reservation.
+    
+    `pending_rows` maps reservations made earlier in the same batch to their
+    not yet inserted Defect rows. With commit=False the update is only flushed.
+    With wait=False a pending match returns (None, None) straight away.
+    """
+    import asyncio
+    while True:
+        entry, is_new = detection_index.match_or_reserve(defect.defect_type, defect.latitude, defect.longitude)
+        if is_new:
+            return None, entry
+        
+        if pending_rows and entry in pending_rows:
+            # Same fault reported twice in one batch
+            row = pending_rows[entry]
+            row.hit_count += 1
+            row.last_seen_at = datetime.now()
+            if defect.confidence > row.confidence:
+                row.confidence = defect.confidence
+                row.image_url = defect.image_url
+            return row, None
+        
+        # The matching defect may still be in its Groq analysis
+        if not entry.ready.is_set():
+            if not wait or not await asyncio.to_thread(entry.ready.wait, DEDUP_PENDING_TIMEOUT_SECONDS):
+                # Still pending; the reservation belongs to its owner, so leave it be
+                return None, None
+        if entry.defect_id is None:
+            # Released by its owner; look again
+            continue
+        
+        existing = db.query(Defect).filter(Defect.id == entry.defect_id).first()
+        if existing is None or existing.status == "Resolved":
+            # Deleted or already fixed; this is a new occurrence
+            detection_index.discard(entry)
+            continue
+        
+        existing.hit_count = Defect.hit_count + 1
+        existing.last_seen_at = datetime.now()
+        if defect.confidence > (existing.confidence or 0):
+            existing.confidence = defect.confidence
+            existing.image_url = defect.image_url
+        if commit:
+            db.commit()
+            db.refresh(existing)
+        else:
+            db.flush()
+        return existing, None
+
 @app.post("/analyze", response_model=DefectResponse)
-async def analyze_defect(defect: DefectCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def analyze_defect(
+    defect: DefectCreate,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Receives detection data from Vision System.
+    Repeating an Idempotency-Key header returns the original defect.
+    """
+    async def handler():
+        db_defect = await ingest_defect(defect, background_tasks, db)
+        return DefectResponse.model_validate(db_defect).model_dump(mode="json")
+
+    result, replayed = await idempotency_store.run("analyze", idempotency_key, defect.model_dump_json(), handler)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+async def ingest_defect(defect: DefectCreate, background_tasks: BackgroundTasks, db: Session):
+    """
     1. Calls Groq for analysis.
     2. Saves to DB.
     3. Sends alert if Critical.
     """
-    location_str = f"Lat: {defect.latitude}, Lon: {defect.longitude}, Station: {defect.nearest_station}"
-    
-    # 1. Groq Analysis
-    print(f"Analyzing defect: {defect.defect_type} with confidence {defect.confidence}%")
-    # Offload blocking synchronous call to thread pool
-    import asyncio
+    # 0. Merge repeated detections of the same fault (no new row, Groq call or email)
+    dedup_entry = None
+    if defect.latitude is not None and defect.longitude is not None and detection_index.enabled:
+        merged, dedup_entry = await merge_repeat_detection(defect, db)
+        if merged is not None:
+            print(f"Repeat detection merged into defect {merged.id} (hits: {merged.hit_count})")
+            return merged
+    
+    # The reservation is settled however this ends, cancellation included
+    stored = False
     try:
-        analysis = await asyncio.to_thread(groq_service.analyze_defect, defect.defect_type, defect.confidence, location_str)
-    except Exception as e:
-        print(f"ERROR calling Groq Service: {e}")
-        analysis = {}
-
-    # Normalize severity
-    severity = normalize_severity(analysis.get("severity", "High"))
-    
-    # 2. Save to DB
-    db_defect = Defect(
-        defect_type=defect.defect_type,
-        confidence=defect.confidence,
-        image_url=defect.image_url,
-        latitude=defect.latitude,
-        longitude=defect.longitude,
-        nearest_station=defect.nearest_station,
-        severity=severity,
-        root_cause=str(analysis.get("root_cause", "Analysis pending")) if not isinstance(analysis.get("root_cause"), list) else "; ".join(analysis.get("root_cause")),
-        action_required=str(analysis.get("immediate_action", "Awaiting assessment")) if not isinstance(analysis.get("immediate_action"), list) else "; ".join(analysis.get("immediate_action")),
-        resolution_steps=str(analysis.get("resolution_steps", "Pending detailed analysis")) if not isinstance(analysis.get("resolution_steps"), list) else "; ".join(analysis.get("resolution_steps"))
-    )
-    db.add(db_defect)
-    db.commit()
-    db.refresh(db_defect)
+        location_str = f"Lat: {defect.latitude}, Lon: {defect.longitude}, Station: {defect.nearest_station}"
+    
+        # 1. Groq Analysis
+        print(f"Analyzing defect: {defect.defect_type} with confidence {defect.confidence}%")
+        # Offload blocking synchronous call to thread pool
+        import asyncio
+        try:
+            analysis = await asyncio.to_thread(groq_service.analyze_defect, defect.defect_type, defect.confidence, location_str)
+        except Exception as e:
+            print(f"ERROR calling Groq Service: {e}")
+            analysis = {}
+
+        # Normalize severity
+        severity = normalize_severity(analysis.get("severity", "High"))
+    
+        # 2. Save to DB
+        db_defect = Defect(
+            defect_type=defect.defect_type,
+            confidence=defect.confidence,
+            image_url=defect.image_url,
+            latitude=defect.latitude,
+            longitude=defect.longitude,
+            nearest_station=defect.nearest_station,
+            geohash=defect_geohash(defect.latitude, defect.longitude),
+            severity=severity,
+            root_cause=analysis_text(analysis, "root_cause", "Analysis pending"),
+            action_required=analysis_text(analysis, "immediate_action", "Awaiting assessment"),
+            resolution_steps=analysis_text(analysis, "resolution_steps", "Pending detailed analysis")
+        )
+        db.add(db_defect)
+        db.commit()
+        db.refresh(db_defect)
+        stored = True
+    finally:
+        if dedup_entry and stored:
+            detection_index.confirm(dedup_entry, db_defect.id)
+        elif dedup_entry:
+            detection_index.release(dedup_entry)
+    tile_cache.invalidate()
     
     print(f"Defect saved to DB with ID: {db_defect.id}, Severity: {db_defect.severity}")
     
@@ -436,18 +662,7 @@ async def analyze_defect(defect: DefectCreate, background_tasks: BackgroundTasks
     # 4. Background Task for Email to Station Master
     if db_defect.severity == "Critical":
         print(f"Critical defect detected! Sending email alert...")
-        defect_dict = {
-            "defect_type": db_defect.defect_type,
-            "confidence": db_defect.confidence,
-            "latitude": db_defect.latitude,
-            "longitude": db_defect.longitude,
-            "nearest_station": db_defect.nearest_station,
-            "timestamp": db_defect.timestamp,
-            "severity": db_defect.severity,
-            "action_required": db_defect.action_required,
-            "resolution_steps": db_defect.resolution_steps,
-            "image_url": db_defect.image_url
-        }
+        defect_dict = defect_alert_payload(db_defect)
         
         # Send to station master if station assigned
         if nearest_station:
@@ -463,20 +678,374 @@ async def analyze_defect(defect: DefectCreate, background_tasks: BackgroundTasks
         
     return db_defect
 
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+BATCH_ANALYSIS_WORKERS = int(os.getenv("BATCH_ANALYSIS_WORKERS", "4"))
+
+class BatchAnalyzeResponse(BaseModel):
+    received: int
+    created: int
+    merged: int
+    defects: List[DefectResponse]
+
+def analyze_batch_defects(defect_ids: List[int]):
+    """
+    Background task for /analyze/batch: runs the Groq analyses for the new
+    defects in parallel, stores them in one commit and sends Critical alerts.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    db = SessionLocal()
+    try:
+        defects = db.query(Defect).filter(Defect.id.in_(defect_ids)).all()
+        if not defects:
+            return
+
+        def run_analysis(db_defect):
+            location_str = f"Lat: {db_defect.latitude}, Lon: {db_defect.longitude}, Station: {db_defect.nearest_station}"
+            try:
+                return groq_service.analyze_defect(db_defect.defect_type, db_defect.confidence, location_str)
+            except Exception as e:
+                print(f"ERROR calling Groq Service for defect {db_defect.id}: {e}")
+                return {}
+
+        with ThreadPoolExecutor(max_workers=BATCH_ANALYSIS_WORKERS) as pool:
+            analyses = list(pool.map(run_analysis, defects))
+
+        for db_defect, analysis in zip(defects, analyses):
+            db_defect.severity = normalize_severity(analysis.get("severity", "High"))
+            db_defect.root_cause = analysis_text(analysis, "root_cause", "Analysis pending")
+            db_defect.action_required = analysis_text(analysis, "immediate_action", "Awaiting assessment")
+            db_defect.resolution_steps = analysis_text(analysis, "resolution_steps", "Pending detailed analysis")
+        db.commit()
+        tile_cache.invalidate()
+        print(f"Batch analysis stored for {len(defects)} defects")
+
+        for db_defect in defects:
+            if db_defect.severity != "Critical":
+                continue
+            station = db_defect.assigned_station
+            if station:
+                email_service.send_alert(
+                    defect_alert_payload(db_defect),
+                    recipient_email=station.station_master_email,
+                    station_name=station.name
+                )
+            else:
+                email_service.send_alert(defect_alert_payload(db_defect))
+    except Exception as e:
+        db.rollback()
+        print(f"Batch analysis error: {e}")
+    finally:
+        db.close()
+
+@app.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_defects_batch(
+    defects: List[DefectCreate],
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Receives a whole inspection run from the Vision System in one request.
+    Repeating an Idempotency-Key header returns the original result.
+    """
+    async def handler():
+        result = await ingest_defect_batch(defects, background_tasks, db)
+        return BatchAnalyzeResponse.model_validate(result, from_attributes=True).model_dump(mode="json")
+
+    fingerprint = hashlib.sha256(
+        "\n".join(item.model_dump_json() for item in defects).encode()
+    ).hexdigest()
+    result, replayed = await idempotency_store.run("analyze-batch", idempotency_key, fingerprint, handler)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+def pending_defect_row(item: DefectCreate):
+    """New Defect row for a batch item, analyzed later by analyze_batch_defects."""
+    return Defect(
+        defect_type=item.defect_type,
+        confidence=item.confidence,
+        image_url=item.image_url,
+        latitude=item.latitude,
+        longitude=item.longitude,
+        nearest_station=item.nearest_station,
+        geohash=defect_geohash(item.latitude, item.longitude),
+        severity="Pending",
+        hit_count=1,
+        root_cause="Analysis pending",
+        action_required="Awaiting assessment",
+        resolution_steps="Pending detailed analysis"
+    )
+
+async def ingest_deferred_detection(item: DefectCreate, db: Session):
+    """
+    Merge or store one batch item whose match was still pending during the batch.
+    Runs after the batch committed, so waiting on the match holds no reservations.
+    Returns (row, created).
+    """
+    merged, entry = await merge_repeat_detection(item, db)
+    if merged is not None:
+        return merged, False
+
+    row = pending_defect_row(item)
+    stations = find_nearest_stations([(row.latitude, row.longitude)], db)
+    if stations[0]:
+        row.assigned_station_id = stations[0].id
+    stored = False
+    try:
+        db.add(row)
+        db.commit()
+        stored = True
+    finally:
+        if entry and stored:
+            detection_index.confirm(entry, row.id)
+        elif entry:
+            detection_index.release(entry)
+    return row, True
+
+async def ingest_defect_batch(defects: List[DefectCreate], background_tasks: BackgroundTasks, db: Session):
+    """
+    1. Merges repeat detections (within the batch and with recent defects).
+    2. Assigns stations in one pass and inserts new defects in a single transaction.
+    3. Queues Groq analysis and Critical alerts for the new defects together.
+    New defects are returned with severity "Pending" until their analysis lands.
+
+    Items matching a defect another request is still storing are set aside
+    and merged after the commit: waiting on it while holding this batch's
+    own reservations would stall two overlapping batches on each other.
+    """
+    if not defects:
+        raise HTTPException(status_code=400, detail="No defects provided")
+    if len(defects) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_SIZE} defects)")
+
+    new_items = []
+    pending_rows = {}
+    merged_ids = set()
+    deferred = []
+    try:
+        for item in defects:
+            has_location = item.latitude is not None and item.longitude is not None
+            if has_location and detection_index.enabled:
+                merged, entry = await merge_repeat_detection(
+                    item, db, pending_rows=pending_rows, commit=False, wait=False
+                )
+                if merged is not None:
+                    if merged.id is not None:
+                        merged_ids.add(merged.id)
+                    continue
+                if entry is None:
+                    deferred.append(item)
+                    continue
+            else:
+                entry = None
+
+            row = pending_defect_row(item)
+            if entry is not None:
+                pending_rows[entry] = row
+            new_items.append(row)
+
+        # One station lookup for the whole batch
+        located = [row for row in new_items if row.latitude and row.longitude]
+        stations = find_nearest_stations([(row.latitude, row.longitude) for row in located], db)
+        for row, station in zip(located, stations):
+            if station:
+                row.assigned_station_id = station.id
+
+        db.add_all(new_items)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for entry in pending_rows:
+            detection_index.release(entry)
+        raise
+
+    for entry, row in pending_rows.items():
+        detection_index.confirm(entry, row.id)
+
+    created_ids = [row.id for row in new_items]
+    for item in deferred:
+        row, created = await ingest_deferred_detection(item, db)
+        if created:
+            created_ids.append(row.id)
+        else:
+            merged_ids.add(row.id)
+    tile_cache.invalidate()
+
+    merged_count = len(defects) - len(created_ids)
+    print(f"Batch ingest: {len(defects)} received, {len(created_ids)} created, {merged_count} merged")
+    if created_ids:
+        background_tasks.add_task(analyze_batch_defects, created_ids)
+
+    returned_ids = created_ids + sorted(merged_ids - set(created_ids))
+    stored = db.query(Defect).filter(Defect.id.in_(returned_ids)).all()
+    by_id = {row.id: row for row in stored}
+    return {
+        "received": len(defects),
+        "created": len(created_ids),
+        "merged": merged_count,
+        "defects": [by_id[defect_id] for defect_id in returned_ids if defect_id in by_id]
+    }
+
 @app.get("/defects", response_model=List[DefectResponse])
 def get_defects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     defects = db.query(Defect).order_by(Defect.timestamp.desc()).offset(skip).limit(limit).all()
     return defects
 
-@app.get("/defects/export/excel")
-def export_defects_excel(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@app.get("/defects/clusters")
+def get_defect_clusters(
+    zoom: int,
+    x: int,
+    y: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """
-    Export all defects to Excel file.
-    Available for both Admin and StationMaster users.
+    Aggregate defects inside one map tile (z/x/y) into geohash cells.
+    Each cell carries its defect count, open count and severity mix so the
+    map can draw clusters instead of one marker per defect.
     """
-    # Get all defects
-    defects = db.query(Defect).order_by(Defect.timestamp.desc()).all()
-    
+    if not (0 <= zoom <= 22):
+        raise HTTPException(status_code=400, detail="Zoom must be between 0 and 22")
+    if not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range for zoom level")
+
+    cache_key = (zoom, x, y)
+    cached = tile_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    version = tile_cache.version
+
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(zoom, x, y)
+    precision = geohash_precision_for_zoom(zoom)
+
+    rows = query_defects_in_bbox(
+        db, min_lat, min_lon, max_lat, max_lon,
+        query=db.query(Defect.geohash, Defect.latitude, Defect.longitude, Defect.severity, Defect.status)
+    ).all()
+
+    cells = {}
+    for geohash, latitude, longitude, severity, defect_status in rows:
+        cell_id = geohash[:precision] if geohash else geohash_encode(latitude, longitude, precision)
+        cell = cells.get(cell_id)
+        if cell is None:
+            cell = cells[cell_id] = {
+                "geohash": cell_id,
+                "count": 0,
+                "open_count": 0,
+                "severity": {"Critical": 0, "High": 0, "Low": 0, "Pending": 0},
+                "lat_sum": 0.0,
+                "lon_sum": 0.0
+            }
+        cell["count"] += 1
+        if defect_status != "Resolved":
+            cell["open_count"] += 1
+        severity_key = severity if severity in cell["severity"] else "Pending"
+        cell["severity"][severity_key] += 1
+        cell["lat_sum"] += latitude
+        cell["lon_sum"] += longitude
+
+    clusters = []
+    for cell in cells.values():
+        count = cell.pop("count")
+        lat_sum = cell.pop("lat_sum")
+        lon_sum = cell.pop("lon_sum")
+        clusters.append({
+            **cell,
+            "count": count,
+            # Centroid of the member defects looks better on the map than the cell center
+            "latitude": lat_sum / count,
+            "longitude": lon_sum / count
+        })
+
+    result = {
+        "zoom": zoom,
+        "x": x,
+        "y": y,
+        "precision": precision,
+        "bounds": [min_lat, min_lon, max_lat, max_lon],
+        "total": len(rows),
+        "clusters": clusters
+    }
+    tile_cache.set(cache_key, result, version)
+    return result
+
+@app.get("/defects/bbox", response_model=List[DefectResponse])
+def get_defects_in_bbox(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get individual defects inside the visible map area, newest first."""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Bounding box minimum must not exceed maximum")
+
+    defects = query_defects_in_bbox(db, min_lat, min_lon, max_lat, max_lon).order_by(
+        Defect.timestamp.desc()
+    ).limit(limit).all()
+    return defects
+
+@app.get("/defects/nearby")
+def get_defects_nearby(
+    latitude: float,
+    longitude: float,
+    radius_km: float = 1.0,
+    limit: int = Query(100, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get defects within a radius of a point, nearest first."""
+    if radius_km <= 0 or radius_km > 500:
+        raise HTTPException(status_code=400, detail="Radius must be between 0 and 500 km")
+
+    matches = find_defects_within_radius(db, latitude, longitude, radius_km)[:limit]
+    return [
+        {**DefectResponse.model_validate(defect).model_dump(), "distance_km": round(distance, 4)}
+        for defect, distance in matches
+    ]
+
+@app.get("/defects/search")
+def search_defect_analyses(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search over root causes, actions and resolution steps, best matches first."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+    if limit < 1 or limit > 100 or offset < 0:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 100 and offset non-negative")
+
+    total, hits = search_defects(db, q, limit, offset)
+    return {
+        "query": q,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "results": [
+            {**DefectResponse.model_validate(defect).model_dump(), "rank": round(rank, 4), "snippet": snippet}
+            for defect, rank, snippet in hits
+        ]
+    }
+
+def build_defects_workbook(defects, resolver_name):
+    """
+    Build the defect report workbook.
+    `resolver_name(user_id)` returns the display name for a resolver.
+    """
+    # Imported here so they don't slow down every cold start
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment
+    import pytz
+
     # Create workbook and worksheet
     wb = Workbook()
     ws = wb.active
@@ -507,10 +1076,7 @@ def export_defects_excel(db: Session = Depends(get_db), current_user: User = Dep
         resolved_at_ist = defect.resolved_at.replace(tzinfo=pytz.UTC).astimezone(ist) if defect.resolved_at else None
         
         # Get resolver username
-        resolver_name = ""
-        if defect.resolved_by:
-            resolver = db.query(User).filter(User.id == defect.resolved_by).first()
-            resolver_name = resolver.username if resolver else f"User ID {defect.resolved_by}"
+        resolved_by_name = resolver_name(defect.resolved_by) if defect.resolved_by else ""
         
         row_data = [
             defect.id,
@@ -526,7 +1092,7 @@ def export_defects_excel(db: Session = Depends(get_db), current_user: User = Dep
             defect.action_required or "",
             defect.resolution_steps or "",
             resolved_at_ist.strftime("%Y-%m-%d %H:%M:%S") if resolved_at_ist else "",
-            resolver_name
+            resolved_by_name
         ]
         
         for col_num, value in enumerate(row_data, 1):
@@ -557,6 +1123,34 @@ def export_defects_excel(db: Session = Depends(get_db), current_user: User = Dep
         adjusted_width = min(max_length + 2, 50)  # Cap at 50 for very long text
         ws.column_dimensions[column_letter].width = adjusted_width
     
+    return wb
+
+@app.get("/defects/export/excel")
+def export_defects_excel(
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export all defects to Excel file.
+    Available for both Admin and StationMaster users.
+    With include_archived, archived resolved defects are included too.
+    """
+    # Get all defects
+    defects = db.query(Defect).order_by(Defect.timestamp.desc()).all()
+    if include_archived:
+        defects = sorted(
+            defects + load_archived_defects(db),
+            key=lambda defect: defect.timestamp or datetime.min,
+            reverse=True
+        )
+    
+    def resolver_name(user_id):
+        resolver = db.query(User).filter(User.id == user_id).first()
+        return resolver.username if resolver else f"User ID {user_id}"
+    
+    wb = build_defects_workbook(defects, resolver_name)
+    
     # Save to BytesIO
     excel_file = io.BytesIO()
     wb.save(excel_file)
@@ -605,6 +1199,7 @@ def resolve_defect(
     defect.resolved_by = current_user.id
     
     db.commit()
+    tile_cache.invalidate()
     db.refresh(defect)
     
     return defect
@@ -631,10 +1226,50 @@ def reopen_defect(
     defect.resolved_by = None
     
     db.commit()
+    tile_cache.invalidate()
     db.refresh(defect)
     
     return defect
 
+@app.get("/stats")
+def get_stats(
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Defect counts by status and severity; archived defects are counted with include_archived."""
+    by_status = dict(db.query(Defect.status, func.count(Defect.id)).group_by(Defect.status).all())
+    by_severity = dict(db.query(Defect.severity, func.count(Defect.id)).group_by(Defect.severity).all())
+    stats = {"total": sum(by_status.values())}
+
+    if include_archived:
+        archived_status = archived_counts(db, "status")
+        for key, count in archived_status.items():
+            by_status[key] = by_status.get(key, 0) + count
+        for key, count in archived_counts(db, "severity").items():
+            by_severity[key] = by_severity.get(key, 0) + count
+        stats["archived"] = sum(archived_status.values())
+        stats["total"] += stats["archived"]
+
+    stats["by_status"] = {key or "Unknown": count for key, count in by_status.items()}
+    stats["by_severity"] = {key or "Unknown": count for key, count in by_severity.items()}
+    return stats
+
+@app.post("/admin/archive")
+def archive_defects(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin)
+):
+    """Move resolved defects older than `older_than_days` to cold storage (Admin only)."""
+    if older_than_days < 1:
+        raise HTTPException(status_code=400, detail="older_than_days must be at least 1")
+    count = archive_resolved_defects(db, older_than_days, dry_run=dry_run)
+    if count and not dry_run:
+        tile_cache.invalidate()
+    return {"archived": 0 if dry_run else count, "eligible": count, "older_than_days": older_than_days, "dry_run": dry_run}
+
 @app.delete("/defects/{defect_id}")
 def delete_defect(
     defect_id: int,
@@ -661,6 +1296,7 @@ def delete_defect(
     # Delete from database
     db.delete(defect)
     db.commit()
+    tile_cache.invalidate()
     
     return {"message": "Defect deleted successfully", "defect_id": defect_id}
 
@@ -705,6 +1341,7 @@ def bulk_delete_defects(
             errors.append(f"Error deleting defect {defect_id}: {str(e)}")
     
     db.commit()
+    tile_cache.invalidate()
     
     return {
         "message": f"Successfully deleted {deleted_count} defect(s)",
@@ -714,72 +1351,150 @@ def bulk_delete_defects(
 
 
 # Drone Inspection Control (Admin only)
-drone_process = None
+# Run state lives in the drone_runs table, so every worker agrees on it
+DRONE_RUN_NAME = "drone"
 
 @app.post("/drone/start")
-def start_drone_inspection(admin: User = Depends(require_admin)):
+def start_drone_inspection(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
     """Start the drone inspection vision agent (Admin only)."""
-    global drone_process
+    # Get path to vision agent
+    vision_agent_path = Path(__file__).parent.parent / "vision" / "vision_agent.py"
     
-    if drone_process and drone_process.poll() is None:
-        raise HTTPException(status_code=400, detail="Drone inspection is already running")
+    if not vision_agent_path.exists():
+        raise HTTPException(status_code=500, detail="Vision agent script not found")
     
     try:
-        # Get path to vision agent
-        vision_agent_path = Path(__file__).parent.parent / "vision" / "vision_agent.py"
-        
-        if not vision_agent_path.exists():
-            raise HTTPException(status_code=500, detail="Vision agent script not found")
-        
-        # Start the vision agent in non-interactive drone mode
-        drone_process = subprocess.Popen(
+        # Start the vision agent in non-interactive drone mode.
+        # Output is unbuffered and drained by a reader thread, see drone_logs.py
+        drone_process = drone_controller.start(
+            db,
+            DRONE_RUN_NAME,
             ["python", str(vision_agent_path), "--mode", "drone"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            **logged_popen_kwargs()
         )
-        
-        return {
-            "status": "started",
-            "message": "Drone inspection started successfully",
-            "process_id": drone_process.pid
-        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start drone inspection: {str(e)}")
+    
+    if drone_process is None:
+        raise HTTPException(status_code=400, detail="Drone inspection is already running")
+    
+    get_process_log(DRONE_RUN_NAME).attach(drone_process)
+    
+    return {
+        "status": "started",
+        "message": "Drone inspection started successfully",
+        "process_id": drone_process.pid
+    }
 
 @app.post("/drone/stop")
-def stop_drone_inspection(admin: User = Depends(require_admin)):
+def stop_drone_inspection(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
     """Stop the drone inspection vision agent (Admin only)."""
-    global drone_process
+    try:
+        result = drone_controller.stop(db, DRONE_RUN_NAME)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to stop drone inspection: {str(e)}")
     
-    if not drone_process or drone_process.poll() is not None:
+    if result is None:
         raise HTTPException(status_code=400, detail="Drone inspection is not running")
     
-    try:
-        drone_process.terminate()
-        drone_process.wait(timeout=5)
-        drone_process = None
-        
+    if result == "stopping":
         return {
-            "status": "stopped",
-            "message": "Drone inspection stopped successfully"
+            "status": "stopping",
+            "message": "Stop requested; the worker running the drone will stop it shortly"
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to stop drone inspection: {str(e)}")
+    return {
+        "status": "stopped",
+        "message": "Drone inspection stopped successfully"
+    }
 
 @app.get("/drone/status")
-def get_drone_status(current_user: User = Depends(get_current_user)):
+def get_drone_status(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Get the current status of drone inspection."""
-    global drone_process
+    return drone_controller.status(db, DRONE_RUN_NAME)
+
+@app.get("/drone/logs")
+def get_drone_logs(lines: int = 200, admin: User = Depends(require_admin)):
+    """Last lines of vision agent output (Admin only)."""
+    lines = max(1, min(lines, 5000))
+    if DRONE_RUN_NAME in drone_controller.processes:
+        # This worker runs the agent, so the ring buffer is current
+        return {"lines": get_process_log(DRONE_RUN_NAME).tail(lines)}
+    return {"lines": tail_file(log_path(DRONE_RUN_NAME), lines)}
+
+@app.post("/drone/logs/stream-token")
+def create_drone_log_stream_token(admin: User = Depends(require_admin)):
+    """Short-lived token for opening /drone/logs/stream with EventSource (Admin only)."""
+    token = auth.create_access_token(
+        {"sub": admin.username, "scope": auth.STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=auth.STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+    return {"token": token, "expires_in": auth.STREAM_TOKEN_EXPIRE_SECONDS}
+
+@app.get("/drone/logs/stream")
+async def stream_drone_logs(request: Request, lines: int = 50, admin: User = Depends(require_admin_stream)):
+    """
+    Live vision agent output as server-sent events (Admin only).
+    Authenticate with a Bearer header, or with ?token= from /drone/logs/stream-token.
+    """
+    return StreamingResponse(
+        follow_log(DRONE_RUN_NAME, request, backlog=max(0, min(lines, 1000))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Drone fleet: several vision agents, each with its own source and location
+class FleetWorkerConfig(BaseModel):
+    worker_id: str
+    source: str  # camera index, video file or stream URL
+    latitude: float
+    longitude: float
+    loop: bool = False  # replay video files when they end
+
+class FleetStartRequest(BaseModel):
+    workers: List[FleetWorkerConfig]
+
+@app.post("/drone/fleet/start")
+def start_drone_fleet(
+    request: FleetStartRequest,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin)
+):
+    """Start a fleet of vision agent workers, restarted with backoff if they crash (Admin only)."""
+    if not request.workers:
+        raise HTTPException(status_code=400, detail="No workers provided")
+    if len(request.workers) > FLEET_MAX_WORKERS:
+        raise HTTPException(status_code=400, detail=f"At most {FLEET_MAX_WORKERS} workers per fleet")
+    worker_ids = [worker.worker_id for worker in request.workers]
+    if len(set(worker_ids)) != len(worker_ids):
+        raise HTTPException(status_code=400, detail="Worker ids must be unique")
+    invalid = [worker_id for worker_id in worker_ids if not WORKER_ID_PATTERN.match(worker_id)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid worker ids (use letters, digits, - and _): {invalid}")
+    if not VISION_AGENT_PATH.exists():
+        raise HTTPException(status_code=500, detail="Vision agent script not found")
     
-    is_running = drone_process is not None and drone_process.poll() is None
+    try:
+        started, already_running = fleet_supervisor.start(db, [worker.model_dump() for worker in request.workers])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start drone fleet: {str(e)}")
     
-    return {
-        "is_running": is_running,
-        "process_id": drone_process.pid if is_running else None
-    }
+    return {"started": started, "already_running": already_running}
+
+@app.post("/drone/fleet/stop")
+def stop_drone_fleet(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
+    """Stop every fleet worker (Admin only)."""
+    return {"workers": fleet_supervisor.stop(db)}
+
+@app.get("/drone/fleet")
+def get_drone_fleet(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Per-worker status, frames/sec and detection counts for the drone fleet."""
+    return fleet_supervisor.status(db)
+
+@app.on_event("shutdown")
+def shutdown():
+    # Don't leave vision agents running without a heartbeat
+    fleet_supervisor.shutdown()
+    drone_controller.shutdown()
 
 # Authentication Endpoints
 @app.post("/auth/login", response_model=Token)
@@ -808,10 +1523,20 @@ def get_me(current_user: User = Depends(get_current_user)):
 
 # Station Endpoints
 @app.get("/stations", response_model=List[StationResponse])
-def get_stations(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Get all railway stations."""
-    stations = db.query(Station).all()
-    return stations
+def get_stations(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Get all railway stations.
+    Served from the station cache as pre-serialized JSON; send If-None-Match
+    with the last ETag to get a 304 when nothing changed.
+    """
+    snapshot = station_cache.get(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if snapshot.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=snapshot.payload, media_type="application/json", headers=headers)
 
 @app.post("/stations", response_model=StationResponse, status_code=status.HTTP_201_CREATED)
 def create_station(
@@ -868,6 +1593,7 @@ def create_station(
     )
     db.add(db_user)
     db.commit()
+    station_cache.invalidate()
     
     return db_station
 
@@ -918,6 +1644,7 @@ def update_station(
         db_station.station_master_email = station_update.station_master_email
     
     db.commit()
+    station_cache.invalidate()
     db.refresh(db_station)
     
     return db_station
@@ -954,6 +1681,7 @@ def delete_station(
         db.delete(db_station)
         
         db.commit()
+        station_cache.invalidate()
         print(f"DELETION_SUCCESS: Station {station_id} and its associated users removed")
     except Exception as e:
         db.rollback()
@@ -962,6 +1690,17 @@ def delete_station(
     
     return None
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request latency, in-flight requests and pipeline stage timings in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Railway Defect Detection API is running"}
+
+if __name__ == "__main__":
+    import sys
+    if "--startup-tasks" in sys.argv:
+        # Release step for SKIP_STARTUP_TASKS deployments
+        run_startup_tasks(force=True)
@@ -0,0 +1,92 @@
+"""
+Throughput of the vision agent's model client across batch sizes.
+
+Starts the stub model API (perf/stubs.py) with --model-concurrency model
+workers and pushes the same JPEG through vision/inference.py's
+RemoteBackend from --concurrency threads, once per batch size. Batch
+size 1 is the per-frame baseline:
+
+    python perf/batchbench.py
+    python perf/batchbench.py --sizes 1 4 16 --model-latency 300 --concurrency 32
+    python perf/batchbench.py --no-batch      # server without /predict/batch: checks the fallback
+"""
+import sys
+import time
+import argparse
+import statistics
+import threading
+from pathlib import Path
+
+VISION_DIR = Path(__file__).resolve().parent.parent.parent / "vision"
+sys.path.insert(0, str(VISION_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from inference import RemoteBackend
+from stubs import StubConfig, start_stub_server
+
+# Any bytes work for the stub; the size is that of a typical 640x480 JPEG
+IMAGE = b"\xff\xd8" + bytes(60 * 1024) + b"\xff\xd9"
+
+def run(base_url, batch_size, frames, concurrency, max_wait_ms):
+    client = RemoteBackend(f"{base_url}/predict", f"{base_url}/predict/batch", batch_size, max_wait_ms,
+                            max_in_flight=max(1, concurrency // max(batch_size, 1)))
+    latencies = []
+    lock = threading.Lock()
+    remaining = [frames]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            client.predict(IMAGE)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "batch_size": batch_size,
+        "frames_per_sec": frames / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "requests": client.stats["requests"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Model client throughput by batch size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="Threads calling predict() at once")
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    parser.add_argument("--model-latency", type=float, default=200, help="Stub latency per request in ms")
+    parser.add_argument("--batch-item-latency", type=float, default=10, help="Stub latency per image of a batch in ms")
+    parser.add_argument("--model-concurrency", type=int, default=1,
+                        help="Model calls the stub serves at once (0: unlimited)")
+    parser.add_argument("--no-batch", action="store_true", help="Stub without a batch endpoint")
+    args = parser.parse_args()
+
+    config = StubConfig(model_latency_ms=args.model_latency, batch_item_latency_ms=args.batch_item_latency,
+                        batch_enabled=not args.no_batch, model_concurrency=args.model_concurrency)
+    server, base_url = start_stub_server(config)
+
+    print(f"{'batch':>5} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'requests':>9} {'speedup':>8}")
+    baseline = None
+    for size in args.sizes:
+        result = run(base_url, size, args.frames, args.concurrency, args.max_wait_ms)
+        baseline = baseline or result["frames_per_sec"]
+        print(f"{size:>5} {result['frames_per_sec']:>9.1f} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} "
+              f"{result['requests']:>9} {result['frames_per_sec'] / baseline:>7.1f}x")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Import-time profile of the backend, checked against a budget.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter a few
+times, reports the slowest packages pulled in by main.py and fails when
+the median import time exceeds the budget or when a dependency that should
+be imported lazily (openpyxl, groq, resend, ...) is loaded at startup:
+
+    python perf/importtime.py                     # default budget
+    python perf/importtime.py --budget-ms 800 --top 15
+    python perf/importtime.py --output perf/results/importtime.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Only needed by specific endpoints; importing them in main.py's module
+# scope slows every cold start
+LAZY_MODULES = ["openpyxl", "pytz", "groq", "resend", "numpy", "cv2", "PIL", "pyarrow", "onnxruntime"]
+
+def profile_import(module):
+    """Returns [(depth, self_us, cumulative_us, name)] for one fresh import of `module`."""
+    env = {**os.environ, "DATABASE_URL": "sqlite://"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+def summarize(entries, module):
+    """Total import time of `module` plus its direct imports, slowest first."""
+    total_us = 0
+    direct = []
+    children = []
+    for depth, _, cumulative_us, name in entries:
+        if depth == 0:
+            if name == module:
+                total_us = cumulative_us
+                direct = children
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative_us))
+    loaded = {name for _, _, _, name in entries}
+    return total_us, sorted(direct, key=lambda item: item[1], reverse=True), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Check backend import time against a budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to sample (median is used)")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Maximum median import time")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports to list")
+    parser.add_argument("--output", help="Write the report as JSON here")
+    args = parser.parse_args()
+
+    totals = []
+    direct = []
+    loaded = set()
+    for _ in range(args.runs):
+        total_us, direct, loaded = summarize(profile_import(args.module), args.module)
+        totals.append(total_us / 1000)
+    median_ms = statistics.median(totals)
+
+    print(f"⏱️ import {args.module}: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f} ms, budget {args.budget_ms:.0f} ms)")
+    print("\nSlowest direct imports (last run):")
+    for name, cumulative_us in direct[:args.top]:
+        print(f"  {name:<30} {cumulative_us / 1000:8.1f} ms")
+
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({
+            "module": args.module,
+            "runs_ms": [round(t, 1) for t in totals],
+            "median_ms": round(median_ms, 1),
+            "budget_ms": args.budget_ms,
+            "direct_imports_ms": {name: round(us / 1000, 1) for name, us in direct},
+            "eager_lazy_modules": eager
+        }, indent=2))
+        print(f"\n💾 Report written to {args.output}")
+
+    if failures:
+        print("\n❌ Import budget check failed:")
+        for line in failures:
+            print(f"   {line}")
+        sys.exit(1)
+    print("\n✅ Within import budget")
+
+if __name__ == "__main__":
+    main()
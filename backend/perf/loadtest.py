@@ -0,0 +1,288 @@
+"""
+End-to-end load test for the backend.
+
+Starts the stub services (see stubs.py) and the FastAPI app under uvicorn
+against a scratch database, then drives /analyze, /upload-analyze, /defects
+and the Excel export concurrently and writes throughput and latency
+percentiles as a JSON baseline.
+
+    python perf/loadtest.py --output perf/baseline.json
+    python perf/loadtest.py --compare perf/baseline.json --tolerance 0.2
+
+With --compare the run fails (exit code 1) when any scenario's p95 latency
+rises or its throughput drops by more than the tolerance.
+Pass --database-url to test against PostgreSQL; the database must be a
+scratch one, since the run creates stations and defects in it.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import shutil
+import tempfile
+import subprocess
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stubs import StubConfig, start_stub_server
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = ["analyze", "upload", "defects", "export"]
+MIXED_WEIGHTS = {"analyze": 5, "upload": 2, "defects": 8, "export": 1}
+
+STATIONS = [
+    ("New Delhi", "NDLS", 28.6415, 77.2194),
+    ("Agra Cantt", "AGC", 27.1585, 77.9905),
+    ("Jaipur Junction", "JP", 26.9196, 75.7878),
+    ("Lucknow Charbagh", "LKO", 26.8311, 80.9226),
+]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def start_backend(port, env, workers, workdir):
+    """Start uvicorn in `workdir` so uploads and the SQLite file stay out of the repo."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Backend exited during startup")
+        try:
+            if requests.get(base_url + "/", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Backend did not become ready within 60s")
+
+class LoadClient:
+    def __init__(self, base_url, token):
+        self.base_url = base_url
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.local = threading.local()
+        self.image = bytes(random.getrandbits(8) for _ in range(20_000))
+
+    @property
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def random_location(self):
+        _, _, lat, lon = random.choice(STATIONS)
+        return lat + random.uniform(-0.3, 0.3), lon + random.uniform(-0.3, 0.3)
+
+    def call(self, scenario):
+        """Run one request; returns (latency_seconds, ok)."""
+        start = time.perf_counter()
+        try:
+            if scenario == "analyze":
+                lat, lon = self.random_location()
+                response = self.session.post(f"{self.base_url}/analyze", json={
+                    "defect_type": "Track Defect",
+                    "confidence": round(random.uniform(70, 99), 2),
+                    "image_url": "/uploads/loadtest.jpg",
+                    "latitude": lat,
+                    "longitude": lon,
+                    "nearest_station": "Load Test"
+                }, timeout=120)
+            elif scenario == "upload":
+                lat, lon = self.random_location()
+                response = self.session.post(
+                    f"{self.base_url}/upload-analyze",
+                    params={"latitude": lat, "longitude": lon},
+                    files={"file": ("frame.jpg", self.image, "image/jpeg")},
+                    headers=self.headers,
+                    timeout=120
+                )
+            elif scenario == "defects":
+                response = self.session.get(f"{self.base_url}/defects", params={"limit": 100}, timeout=120)
+            elif scenario == "export":
+                response = self.session.get(f"{self.base_url}/defects/export/excel", headers=self.headers, timeout=300)
+            else:
+                raise ValueError(f"Unknown scenario: {scenario}")
+            ok = response.status_code < 400
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+def run_scenario(client, name, total_requests, concurrency):
+    if name == "mixed":
+        population = list(MIXED_WEIGHTS)
+        weights = list(MIXED_WEIGHTS.values())
+        plan = random.choices(population, weights=weights, k=total_requests)
+    else:
+        plan = [name] * total_requests
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client.call, plan))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round((total_requests - errors) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None
+    }
+
+def compare(results, baseline, tolerance):
+    """Returns a list of human-readable regressions against a previous run."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous.get("p95_ms") and current.get("p95_ms") and \
+                current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous.get("throughput_rps") and \
+                current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend load test with local service stubs")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--export-requests", type=int, default=10, help="Requests for the export scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS + ["mixed"]))
+    parser.add_argument("--database-url", help="Scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--model-latency", type=float, default=200, help="Stub model API latency in ms")
+    parser.add_argument("--groq-latency", type=float, default=800, help="Stub Groq latency in ms")
+    parser.add_argument("--email-latency", type=float, default=150, help="Stub Resend latency in ms")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    stub_config = StubConfig(args.model_latency, args.groq_latency, args.email_latency)
+    stub_server, stub_url = start_stub_server(stub_config)
+
+    workdir = tempfile.mkdtemp(prefix="railway_loadtest_")
+    database_url = args.database_url or f"sqlite:///{Path(workdir) / 'loadtest.db'}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "MODEL_API_URL": f"{stub_url}/predict",
+        "GROQ_API_KEY": "stub-key",
+        "GROQ_BASE_URL": stub_url,
+        "RESEND_API_KEY": "re_stub",
+        "RESEND_API_URL": stub_url,
+        # Every synthetic detection should become its own defect
+        "DEDUP_WINDOW_SECONDS": "0",
+        # Uploads reuse one image; measure the model call, not prediction cache hits
+        "PREDICTION_CACHE_ENABLED": "false",
+    }
+
+    print(f"🚀 Starting backend against {database_url}")
+    backend, base_url = start_backend(free_port(), env, args.workers, workdir)
+    try:
+        token = requests.post(f"{base_url}/auth/login",
+                              data={"username": "admin", "password": "admin123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for name, code, lat, lon in STATIONS:
+            requests.post(f"{base_url}/stations", headers=headers, json={
+                "name": name, "code": code, "latitude": lat, "longitude": lon,
+                "station_master_email": f"{code.lower()}@example.com",
+                "station_master_username": f"sm_{code.lower()}",
+                "station_master_password": "loadtest"
+            })
+
+        client = LoadClient(base_url, token)
+        results = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "workers": args.workers,
+                "database": "postgresql" if database_url.startswith("postgres") else "sqlite",
+                "model_latency_ms": args.model_latency,
+                "groq_latency_ms": args.groq_latency,
+                "email_latency_ms": args.email_latency
+            },
+            "scenarios": {}
+        }
+
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            total = args.export_requests if name == "export" else args.requests
+            print(f"▶ {name}: {total} requests, concurrency {args.concurrency}")
+            summary = run_scenario(client, name, total, args.concurrency)
+            results["scenarios"][name] = summary
+            print(f"  {summary['throughput_rps']} req/s, p50 {summary['p50_ms']}ms, "
+                  f"p95 {summary['p95_ms']}ms, p99 {summary['p99_ms']}ms, errors {summary['errors']}")
+
+        results["stub_calls"] = dict(stub_config.calls)
+    finally:
+        backend.terminate()
+        try:
+            backend.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+        stub_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"💾 Results written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ Performance regressions:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Microbenchmarks for pure hot-path functions.
+
+Covers haversine_distance, find_nearest_station (10 to 10k stations),
+normalize_severity, Groq response parsing, JWT create/decode and Excel
+report building. Each benchmark is calibrated to run for a minimum time
+per round, and the per-call statistics are saved under perf/results/
+keyed by git commit so runs can be compared before and after a change:
+
+    python perf/microbench.py                          # run and save
+    python perf/microbench.py --filter nearest         # subset by name
+    python perf/microbench.py --compare <commit|file>  # fail on >15% slowdowns
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+import statistics
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Keep imports of main.py away from the real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(BACKEND_DIR))
+
+import auth
+import groq_service
+import location_utils
+import main
+
+_benchmarks = []
+
+def benchmark(name):
+    """Register a setup function returning the zero-argument callable to time."""
+    def register(setup):
+        _benchmarks.append((name, setup))
+        return setup
+    return register
+
+def make_stations(count, rng):
+    return [
+        SimpleNamespace(id=i, latitude=rng.uniform(8, 34), longitude=rng.uniform(68, 97))
+        for i in range(count)
+    ]
+
+def make_defects(count, rng):
+    now = datetime.now()
+    severities = ["Critical", "High", "Low"]
+    defects = []
+    for i in range(count):
+        resolved = rng.random() < 0.4
+        defects.append(SimpleNamespace(
+            id=i + 1,
+            timestamp=now - timedelta(minutes=i),
+            defect_type="Track Defect",
+            severity=rng.choice(severities),
+            status="Resolved" if resolved else "Open",
+            confidence=round(rng.uniform(70, 99), 2),
+            latitude=rng.uniform(8, 34),
+            longitude=rng.uniform(68, 97),
+            nearest_station="Detected Location",
+            root_cause="Rail head wear caused by repeated heavy axle loads and insufficient lubrication.",
+            action_required="Impose a 30 km/h speed restriction and dispatch a track inspection team.",
+            resolution_steps="1. Block the section 2. Grind the rail head 3. Ultrasonic test 4. Reopen",
+            resolved_at=now if resolved else None,
+            resolved_by=rng.randint(1, 20) if resolved else None
+        ))
+    return defects
+
+GROQ_RESPONSE = json.dumps({
+    "root_cause": "Rail head wear caused by repeated heavy axle loads.",
+    "severity": "critical",
+    "immediate_action": "Impose a speed restriction.",
+    "resolution_steps": ["Block the section", "Grind the rail head", "Re-inspect"],
+    "preventive_recommendations": "Quarterly ultrasonic testing."
+})
+
+@benchmark("haversine_distance")
+def bench_haversine(rng):
+    return lambda: location_utils.haversine_distance(28.6139, 77.2090, 19.0760, 72.8777)
+
+# find_nearest_station(s) read the station cache; time the lookup over a given list
+for _count in (10, 100, 1000, 10000):
+    @benchmark(f"find_nearest_station[{_count}]")
+    def bench_nearest(rng, count=_count):
+        stations = make_stations(count, rng)
+        return lambda: location_utils.nearest_station_among(23.5, 80.1, stations)
+
+@benchmark("find_nearest_stations[1000 points x 1000 stations]")
+def bench_nearest_batch(rng):
+    stations = make_stations(1000, rng)
+    points = [(rng.uniform(8, 34), rng.uniform(68, 97)) for _ in range(1000)]
+    return lambda: location_utils.nearest_stations_among(points, stations)
+
+@benchmark("normalize_severity")
+def bench_normalize_severity(rng):
+    values = ["Critical", "high", " Moderate ", "minor", "unknown", None]
+    def run():
+        for value in values:
+            main.normalize_severity(value)
+    return run
+
+@benchmark("groq_service.parse_analysis")
+def bench_parse_analysis(rng):
+    wrapped = "Here is the analysis:\n```json\n" + GROQ_RESPONSE + "\n```"
+    def run():
+        groq_service.parse_analysis(GROQ_RESPONSE)
+        groq_service.parse_analysis(wrapped)
+    return run
+
+@benchmark("auth.create_access_token")
+def bench_create_token(rng):
+    return lambda: auth.create_access_token({"sub": "admin"})
+
+@benchmark("auth.decode_access_token")
+def bench_decode_token(rng):
+    token = auth.create_access_token({"sub": "admin"})
+    return lambda: auth.decode_access_token(token)
+
+for _count in (100, 1000):
+    @benchmark(f"build_defects_workbook[{_count} rows]")
+    def bench_workbook(rng, count=_count):
+        defects = make_defects(count, rng)
+        return lambda: main.build_defects_workbook(defects, lambda user_id: f"sm_{user_id}")
+
+def time_benchmark(func, min_round_time, rounds):
+    """Returns per-call timings in seconds for each round."""
+    # Calibrate the number of calls per round, timeit.autorange style
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time:
+            break
+        number *= 10 if elapsed < min_round_time / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return timings, number
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+def format_time(seconds):
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.1f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+def load_baseline(reference):
+    path = Path(reference)
+    if not path.exists():
+        path = RESULTS_DIR / f"microbench-{reference}.json"
+    return json.loads(path.read_text())
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for backend hot paths")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-save", action="store_true", help="Don't write results to perf/results/")
+    parser.add_argument("--compare", help="Commit id or JSON file of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown of the median")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "benchmarks": {}
+    }
+
+    for name, setup in _benchmarks:
+        if args.filter and args.filter not in name:
+            continue
+        func = setup(random.Random(args.seed))
+        timings, number = time_benchmark(func, args.min_time, args.rounds)
+        stats = {
+            "min_s": min(timings),
+            "median_s": statistics.median(timings),
+            "mean_s": statistics.mean(timings),
+            "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "ops_per_s": 1 / statistics.median(timings),
+            "calls_per_round": number,
+            "rounds": len(timings)
+        }
+        results["benchmarks"][name] = stats
+        print(f"{name:<55} median {format_time(stats['median_s']):>12}   min {format_time(stats['min_s']):>12}")
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"microbench-{results['commit']}.json"
+        path.write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results saved to {path}")
+
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        print(f"\nComparison with {baseline.get('commit')} (median per call):")
+        regressions = []
+        for name, stats in results["benchmarks"].items():
+            previous = baseline["benchmarks"].get(name)
+            if not previous:
+                continue
+            ratio = stats["median_s"] / previous["median_s"]
+            marker = ""
+            if ratio > 1 + args.tolerance:
+                marker = "  ❌ slower"
+                regressions.append(name)
+            elif ratio < 1 - args.tolerance:
+                marker = "  ✅ faster"
+            print(f"  {name:<55} {format_time(previous['median_s']):>12} -> {format_time(stats['median_s']):>12}  x{ratio:.2f}{marker}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,295 @@
+"""
+Synthetic data generator for scale testing.
+
+Places N stations along real Indian rail corridors and generates defects
+along the same track polylines. The defects get plausible severity, status,
+resolver and timestamp distributions, so pagination, export, stats and
+spatial queries can be profiled at production volume:
+
+    python perf/seed_data.py --stations 500 --defects 2000000
+    DATABASE_URL=postgresql://... python perf/seed_data.py --defects 5000000
+
+Defects are written in chunks with executemany on SQLite and COPY on
+PostgreSQL. Synthetic station masters share the password "seeded".
+Point DATABASE_URL at a scratch database; rows are appended, not replaced.
+"""
+import io
+import csv
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import auth
+import database
+from database import Station, User
+from location_utils import haversine_distance, defect_geohash, nearest_stations_among
+
+# Waypoints (lat, lon) of major trunk routes
+CORRIDORS = {
+    "Delhi-Mumbai": [(28.6415, 77.2194), (27.4924, 77.6737), (26.9196, 75.7878), (25.1802, 75.8334),
+                     (23.1765, 75.7885), (22.3072, 73.1812), (21.1702, 72.8311), (19.0760, 72.8777)],
+    "Delhi-Kolkata": [(28.6415, 77.2194), (27.1767, 78.0081), (26.4499, 80.3319), (25.4358, 81.8463),
+                      (25.3176, 82.9739), (25.5941, 85.1376), (23.7957, 86.4304), (22.5726, 88.3639)],
+    "Mumbai-Chennai": [(19.0760, 72.8777), (18.5204, 73.8567), (17.6599, 75.9064), (16.2076, 77.3463),
+                       (15.1394, 76.9214), (14.4426, 79.9865), (13.0827, 80.2707)],
+    "Chennai-Kolkata": [(13.0827, 80.2707), (16.5062, 80.6480), (17.6868, 83.2185), (19.3150, 84.7941),
+                        (20.2961, 85.8245), (21.4934, 86.9135), (22.5726, 88.3639)],
+    "Delhi-Amritsar": [(28.6415, 77.2194), (29.3909, 76.9635), (30.3782, 76.7767), (30.9010, 75.8573),
+                       (31.3260, 75.5762), (31.6340, 74.8723)],
+    "Bengaluru-Chennai": [(12.9716, 77.5946), (12.9165, 79.1325), (13.0827, 80.2707)],
+}
+
+SEVERITIES = ["Critical", "High", "Low"]
+SEVERITY_WEIGHTS = [0.1, 0.55, 0.35]
+
+ROOT_CAUSES = [
+    "Rail head wear caused by repeated heavy axle loads.",
+    "Fastening clips loosened by vibration and missing maintenance.",
+    "Ballast fouling reducing drainage and track support.",
+    "Thermal stress leading to rail buckling on a curved section.",
+    "Corrosion at the rail foot near a level crossing.",
+]
+ACTIONS = [
+    "Impose a 30 km/h speed restriction and dispatch an inspection team.",
+    "Block the line until the fastening is replaced.",
+    "Schedule ballast cleaning and monitor track geometry.",
+]
+RESOLUTION_STEPS = "1. Block the section 2. Replace damaged component 3. Ultrasonic test 4. Reopen"
+
+DEFECT_COLUMNS = [
+    "defect_type", "confidence", "image_url", "latitude", "longitude", "nearest_station", "geohash",
+    "timestamp", "hit_count", "last_seen_at", "severity", "root_cause", "action_required",
+    "resolution_steps", "status", "resolved_at", "resolved_by", "assigned_station_id",
+]
+
+class Polyline:
+    """Corridor with cumulative distances, for sampling points by track kilometre."""
+
+    def __init__(self, name, points):
+        self.name = name
+        self.points = np.array(points, dtype=float)
+        lengths = [haversine_distance(*a, *b) for a, b in zip(points[:-1], points[1:])]
+        self.cumulative = np.concatenate([[0.0], np.cumsum(lengths)])
+        self.length_km = float(self.cumulative[-1])
+
+    def interpolate(self, km):
+        """Vectorized: (lat, lon) arrays for positions `km` along the corridor."""
+        km = np.clip(km, 0, self.length_km)
+        segment = np.clip(np.searchsorted(self.cumulative, km, side="right") - 1, 0, len(self.points) - 2)
+        seg_start = self.cumulative[segment]
+        seg_len = self.cumulative[segment + 1] - seg_start
+        t = np.where(seg_len > 0, (km - seg_start) / np.where(seg_len > 0, seg_len, 1), 0)
+        start = self.points[segment]
+        end = self.points[segment + 1]
+        return start[:, 0] + (end[:, 0] - start[:, 0]) * t, start[:, 1] + (end[:, 1] - start[:, 1]) * t
+
+def sample_along_corridors(corridors, count, rng, jitter_m=0.0):
+    """Sample `count` points along the corridors, weighted by corridor length."""
+    lengths = np.array([c.length_km for c in corridors])
+    which = rng.choice(len(corridors), size=count, p=lengths / lengths.sum())
+    lat = np.empty(count)
+    lon = np.empty(count)
+    for index, corridor in enumerate(corridors):
+        mask = which == index
+        n = int(mask.sum())
+        if n:
+            lat[mask], lon[mask] = corridor.interpolate(rng.uniform(0, corridor.length_km, n))
+    if jitter_m:
+        # Track-side GPS noise
+        lat += rng.normal(0, jitter_m / 111_320, count)
+        lon += rng.normal(0, jitter_m / 111_320, count) / np.cos(np.radians(lat))
+    return lat, lon
+
+def seed_stations(db, corridors, count, rng):
+    """Create `count` stations evenly spaced along the corridors, each with a station master."""
+    existing_codes = {code for (code,) in db.query(Station.code).all()}
+    password_hash = auth.get_password_hash("seeded")  # Argon2 is slow; hash once
+
+    total_km = sum(c.length_km for c in corridors)
+    created = 0
+    serial = 0
+    for corridor in corridors:
+        share = max(1, round(count * corridor.length_km / total_km))
+        lat, lon = corridor.interpolate(np.linspace(0, corridor.length_km, share))
+        for i in range(share):
+            if created >= count:
+                break
+            serial += 1
+            code = f"SYN{serial:05d}"
+            if code in existing_codes:
+                continue
+            station = Station(
+                name=f"{corridor.name} KM {i * corridor.length_km / max(share - 1, 1):.0f} ({code})",
+                code=code,
+                latitude=round(float(lat[i]), 6),
+                longitude=round(float(lon[i]), 6),
+                station_master_email=f"{code.lower()}@seed.example.com"
+            )
+            db.add(station)
+            db.flush()
+            db.add(User(
+                username=f"sm_{code.lower()}",
+                email=station.station_master_email,
+                hashed_password=password_hash,
+                role="StationMaster",
+                station_id=station.id
+            ))
+            created += 1
+    db.commit()
+    return created
+
+def generate_defect_rows(count, corridors, stations, station_masters, admin_ids, days, rng):
+    """Yield defect tuples in DEFECT_COLUMNS order."""
+    lat, lon = sample_along_corridors(corridors, count, rng, jitter_m=15)
+    nearest = nearest_stations_among(list(zip(lat, lon)), stations, 4096) if stations else [None] * count
+
+    now = datetime.now()
+    # Inspections mostly happen in daylight; recent months are busier
+    age_days = rng.exponential(days / 3, count) % days
+    hour = np.clip(rng.normal(13, 3.5, count), 0, 23.99)
+    severity = rng.choice(len(SEVERITIES), size=count, p=SEVERITY_WEIGHTS)
+    confidence = np.round(np.clip(99 - rng.gamma(2.0, 5.0, count), 70.01, 99.99), 2)
+    hit_count = rng.geometric(0.6, count)
+    resolve_roll = rng.random(count)
+    resolve_hours = rng.lognormal(3.0, 1.0, count)
+    by_admin = rng.random(count) < 0.2
+    text_pick = rng.integers(0, 15, count)
+
+    for i in range(count):
+        day = now - timedelta(days=int(age_days[i]))
+        timestamp = day.replace(hour=int(hour[i]), minute=int(hour[i] % 1 * 60), second=0, microsecond=0)
+        if timestamp > now:
+            timestamp -= timedelta(days=1)
+        station = nearest[i]
+
+        # Older defects are much more likely to have been fixed; Critical ones fastest
+        resolve_probability = 0.95 if age_days[i] > 30 else 0.55 if age_days[i] > 3 else 0.2
+        resolved_at = None
+        resolved_by = None
+        if resolve_roll[i] < resolve_probability:
+            speedup = 0.25 if severity[i] == 0 else 1.0
+            resolved_at = min(timestamp + timedelta(hours=float(resolve_hours[i]) * speedup), now)
+            masters = station_masters.get(station.id) if station else None
+            if masters and not by_admin[i]:
+                resolved_by = masters[int(text_pick[i]) % len(masters)]
+            elif admin_ids:
+                resolved_by = admin_ids[int(text_pick[i]) % len(admin_ids)]
+
+        hits = int(hit_count[i])
+        latitude = round(float(lat[i]), 6)
+        longitude = round(float(lon[i]), 6)
+        yield (
+            "Track Defect",
+            float(confidence[i]),
+            f"/uploads/seed_{i % 1000:04d}.jpg",
+            latitude,
+            longitude,
+            "Detected Location",
+            defect_geohash(latitude, longitude),
+            timestamp,
+            hits,
+            timestamp + timedelta(seconds=20 * (hits - 1)) if hits > 1 else None,
+            SEVERITIES[severity[i]],
+            ROOT_CAUSES[text_pick[i] % len(ROOT_CAUSES)],
+            ACTIONS[text_pick[i] % len(ACTIONS)],
+            RESOLUTION_STEPS,
+            "Resolved" if resolved_at else "Open",
+            resolved_at,
+            resolved_by,
+            station.id if station else None,
+        )
+
+def _sqlite_value(value):
+    # Match how SQLAlchemy stores DateTime on SQLite
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value
+
+def insert_sqlite(raw_connection, rows):
+    placeholders = ", ".join("?" for _ in DEFECT_COLUMNS)
+    cursor = raw_connection.cursor()
+    cursor.executemany(
+        f"INSERT INTO defects ({', '.join(DEFECT_COLUMNS)}) VALUES ({placeholders})",
+        [tuple(_sqlite_value(v) for v in row) for row in rows]
+    )
+    raw_connection.commit()
+
+def insert_postgresql(raw_connection, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if v is None else v.isoformat(sep=" ") if isinstance(v, datetime) else v for v in row])
+    buffer.seek(0)
+    cursor = raw_connection.cursor()
+    cursor.copy_expert(
+        f"COPY defects ({', '.join(DEFECT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+        buffer
+    )
+    raw_connection.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the database with synthetic stations and defects")
+    parser.add_argument("--stations", type=int, default=200, help="Stations to create along the corridors")
+    parser.add_argument("--defects", type=int, default=100_000, help="Defects to generate")
+    parser.add_argument("--days", type=int, default=365, help="Spread defect timestamps over this many days")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Rows per bulk insert")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corridors = [Polyline(name, points) for name, points in CORRIDORS.items()]
+    is_postgres = database.DATABASE_URL.startswith("postgresql")
+
+    print(f"🎯 Target database: {database.DATABASE_URL}")
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        if args.stations:
+            created = seed_stations(db, corridors, args.stations, rng)
+            print(f"✅ Created {created} stations with station masters")
+
+        stations = db.query(Station).all()
+        station_masters = {}
+        for user_id, station_id in db.query(User.id, User.station_id).filter(User.role == "StationMaster"):
+            station_masters.setdefault(station_id, []).append(user_id)
+        admin_ids = [user_id for (user_id,) in db.query(User.id).filter(User.role == "Admin")]
+    finally:
+        db.close()
+
+    raw_connection = database.engine.raw_connection()
+    try:
+        if not is_postgres:
+            cursor = raw_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+
+        started = time.perf_counter()
+        inserted = 0
+        while inserted < args.defects:
+            chunk = min(args.chunk_size, args.defects - inserted)
+            rows = list(generate_defect_rows(chunk, corridors, stations, station_masters, admin_ids, args.days, rng))
+            if is_postgres:
+                insert_postgresql(raw_connection, rows)
+            else:
+                insert_sqlite(raw_connection, rows)
+            inserted += chunk
+            rate = inserted / (time.perf_counter() - started)
+            print(f"   {inserted:,}/{args.defects:,} defects ({rate:,.0f} rows/s)")
+    finally:
+        raw_connection.close()
+
+    if is_postgres:
+        # Analyze so the planner has statistics for the new volume
+        with database.engine.begin() as conn:
+            conn.execute(database.text("ANALYZE defects"))
+
+    print(f"✅ Inserted {inserted:,} defects in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Local stand-ins for the external services the backend calls:
+- Model API (MODEL_API_URL):            POST /predict
+- Batched model API (MODEL_BATCH_API_URL): POST /predict/batch (one "files" part per image)
+- Groq (GROQ_BASE_URL):                 POST /openai/v1/chat/completions
+- Resend (RESEND_API_URL):              POST /emails
+
+Each service sleeps for a configurable latency so load tests see realistic
+waits without spending quota. Run standalone with:
+    python perf/stubs.py --port 9100 --model-latency 200 --groq-latency 800
+
+A batch costs --model-latency once plus --batch-item-latency per image, like
+a model server that amortizes its per-request overhead; --no-batch answers
+404 on /predict/batch to test client fallback. --model-concurrency limits how
+many model calls (single or batch) run at once, like a server with a fixed
+number of model workers; by default they all run in parallel.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubConfig:
+    def __init__(self, model_latency_ms=200, groq_latency_ms=800, email_latency_ms=150,
+                 defect_ratio=0.8, critical_ratio=0.2, batch_item_latency_ms=10, batch_enabled=True,
+                 model_concurrency=0):
+        self.model_latency_ms = model_latency_ms
+        self.batch_item_latency_ms = batch_item_latency_ms
+        self.batch_enabled = batch_enabled
+        self.model_slots = threading.Semaphore(model_concurrency) if model_concurrency else None
+        self.groq_latency_ms = groq_latency_ms
+        self.email_latency_ms = email_latency_ms
+        self.defect_ratio = defect_ratio
+        self.critical_ratio = critical_ratio
+        self.calls = {"model": 0, "model_batch": 0, "groq": 0, "email": 0}
+        self.lock = threading.Lock()
+
+    def run_model(self, latency_ms):
+        if self.model_slots:
+            with self.model_slots:
+                time.sleep(latency_ms / 1000)
+        else:
+            time.sleep(latency_ms / 1000)
+
+    def count(self, service):
+        with self.lock:
+            self.calls[service] += 1
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _prediction(self):
+            defective = random.random() < config.defect_ratio
+            return {
+                "prediction": "Defective" if defective else "Non Defective",
+                "confidence": round(random.uniform(72, 99), 2)
+            }
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+
+            if self.path.endswith("/predict"):
+                config.count("model")
+                config.run_model(config.model_latency_ms)
+                self._send_json(self._prediction())
+            elif self.path.endswith("/predict/batch") and config.batch_enabled:
+                config.count("model_batch")
+                images = body.count(b'name="files"')
+                config.run_model(config.model_latency_ms + config.batch_item_latency_ms * images)
+                self._send_json({"predictions": [self._prediction() for _ in range(images)]})
+            elif self.path.endswith("/chat/completions"):
+                config.count("groq")
+                time.sleep(config.groq_latency_ms / 1000)
+                severity = "Critical" if random.random() < config.critical_ratio else random.choice(["High", "Low"])
+                content = json.dumps({
+                    "root_cause": "Rail head wear from repeated heavy axle loads.",
+                    "severity": severity,
+                    "immediate_action": "Impose a speed restriction and inspect the section.",
+                    "resolution_steps": "1. Block section 2. Grind rail head 3. Re-inspect",
+                    "preventive_recommendations": "Schedule ultrasonic testing every quarter."
+                })
+                self._send_json({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "llama-3.3-70b-versatile",
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content}
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                })
+            elif self.path.endswith("/emails"):
+                config.count("email")
+                time.sleep(config.email_latency_ms / 1000)
+                self._send_json({"id": f"stub-{random.getrandbits(32):08x}"})
+            else:
+                self._send_json({"detail": "Not Found"}, status=404)
+
+    return StubHandler
+
+def start_stub_server(config, host="127.0.0.1", port=0):
+    """Start the stub server in a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Model API / Groq / Resend services")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--model-latency", type=float, default=200, help="Model API latency in ms")
+    parser.add_argument("--groq-latency", type=float, default=800, help="Groq latency in ms")
+    parser.add_argument("--email-latency", type=float, default=150, help="Resend latency in ms")
+    parser.add_argument("--batch-item-latency", type=float, default=10, help="Extra model latency per image of a batch in ms")
+    parser.add_argument("--no-batch", action="store_true", help="Answer 404 on /predict/batch")
+    parser.add_argument("--model-concurrency", type=int, default=0, help="Model calls served at once (0: unlimited)")
+    parser.add_argument("--defect-ratio", type=float, default=0.8)
+    parser.add_argument("--critical-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    config = StubConfig(args.model_latency, args.groq_latency, args.email_latency,
+                        args.defect_ratio, args.critical_ratio, args.batch_item_latency, not args.no_batch,
+                        args.model_concurrency)
+    server, base_url = start_stub_server(config, args.host, args.port)
+    print(f"✅ Stub services running at {base_url}")
+    print(f"   MODEL_API_URL={base_url}/predict")
+    print(f"   MODEL_BATCH_API_URL={base_url}/predict/batch")
+    print(f"   GROQ_BASE_URL={base_url}")
+    print(f"   RESEND_API_URL={base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+
+# inference puts the repository root on sys.path for the shared vision code
+import inference
+from metrics import Counter
+from vision.prediction_cache import PredictionCache
+
+# The same image bytes get the same prediction from the same model, so
+# re-uploads skip the model call. Same cache as the vision agent
+# (vision/prediction_cache.py); PREDICTION_CACHE_DIR adds a disk tier that
+# survives restarts and is shared by the API workers on a node.
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "4096"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+
+PREDICTION_CACHE_LOOKUPS = Counter(
+    "prediction_cache_lookups_total",
+    "Model prediction lookups by source (memory, disk, coalesced, model).",
+    ("source",)
+)
+
+def model_namespace():
+    if inference.MODEL_BACKEND == "local":
+        return f"local:{inference.MODEL_PATH}:{inference.MODEL_OUTPUT}"
+    return f"remote:{inference.MODEL_API_URL}"
+
+def cached_predict(contents, compute):
+    """compute(contents) through the prediction cache (if enabled). Returns (result, source)."""
+    if prediction_cache is None:
+        return compute(contents), "model"
+    result, source = prediction_cache.get_or_compute(contents, compute)
+    PREDICTION_CACHE_LOOKUPS.inc(source=source)
+    return result, source
+
+prediction_cache = PredictionCache(
+    model_namespace(), PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS, PREDICTION_CACHE_DIR or None
+) if PREDICTION_CACHE_ENABLED else None
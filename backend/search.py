@@ -0,0 +1,81 @@
+import re
+from sqlalchemy import text
+
+import database
+from database import Defect, SEARCH_DOCUMENT_POSTGRES
+
+SNIPPET_TOKENS = 16
+
+def fts5_query(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last one as a prefix.
+    Returns None if the text has no searchable words.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def _search_sqlite(db, query, limit, offset):
+    match = fts5_query(query)
+    if match is None:
+        return 0, []
+    total = db.execute(
+        text("SELECT count(*) FROM defects_fts WHERE defects_fts MATCH :match"), {"match": match}
+    ).scalar()
+    # bm25() is lower-is-better; root causes weigh more than the action/resolution text
+    rows = db.execute(text(f"""
+        SELECT rowid AS id,
+               -bm25(defects_fts, 2.0, 1.0, 1.0) AS rank,
+               snippet(defects_fts, -1, '[', ']', '…', {SNIPPET_TOKENS}) AS snippet
+        FROM defects_fts
+        WHERE defects_fts MATCH :match
+        ORDER BY bm25(defects_fts, 2.0, 1.0, 1.0)
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "limit": limit, "offset": offset}).all()
+    return total, rows
+
+def _search_postgres(db, query, limit, offset):
+    total = db.execute(text(f"""
+        SELECT count(*) FROM defects
+        WHERE {SEARCH_DOCUMENT_POSTGRES} @@ websearch_to_tsquery('english', :query)
+    """), {"query": query}).scalar()
+    # Rank and page first, so ts_headline only runs for the returned rows
+    rows = db.execute(text(f"""
+        SELECT page.id, page.rank,
+               ts_headline('english',
+                   concat_ws(' … ', d.root_cause, d.action_required, d.resolution_steps),
+                   websearch_to_tsquery('english', :query),
+                   'StartSel=[, StopSel=], MaxWords={SNIPPET_TOKENS}, MinWords=5') AS snippet
+        FROM (
+            SELECT id, ts_rank_cd({SEARCH_DOCUMENT_POSTGRES}, websearch_to_tsquery('english', :query)) AS rank
+            FROM defects
+            WHERE {SEARCH_DOCUMENT_POSTGRES} @@ websearch_to_tsquery('english', :query)
+            ORDER BY rank DESC, id DESC
+            LIMIT :limit OFFSET :offset
+        ) AS page
+        JOIN defects d ON d.id = page.id
+        ORDER BY page.rank DESC, page.id DESC
+    """), {"query": query, "limit": limit, "offset": offset}).all()
+    return total, rows
+
+def search_defects(db, query, limit=20, offset=0):
+    """
+    Full-text search over root_cause, action_required and resolution_steps.
+    Returns (total_hits, [(defect, rank, snippet)]) with the best matches first.
+    """
+    if database.DATABASE_URL.startswith("postgresql"):
+        total, rows = _search_postgres(db, query, limit, offset)
+    else:
+        total, rows = _search_sqlite(db, query, limit, offset)
+    if not rows:
+        return total, []
+
+    defects = {d.id: d for d in db.query(Defect).filter(Defect.id.in_([row.id for row in rows])).all()}
+    return total, [
+        (defects[row.id], row.rank, row.snippet)
+        for row in rows
+        if row.id in defects
+    ]
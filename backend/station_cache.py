@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import namedtuple
+
+# Stations change rarely but are read on every page load and every ingest.
+# Station CRUD in this process bumps the version; the TTL bounds how long
+# other worker processes can serve a stale list.
+STATION_CACHE_TTL_SECONDS = float(os.getenv("STATION_CACHE_TTL_SECONDS", "60"))
+
+CachedStation = namedtuple(
+    "CachedStation",
+    ["id", "name", "code", "latitude", "longitude", "station_master_email"]
+)
+
+StationSnapshot = namedtuple("StationSnapshot", ["stations", "payload", "etag", "version"])
+
+class StationCache:
+    """
+    Process-level cache of all stations.
+    Keeps immutable station tuples for lookups plus the pre-serialized
+    /stations response body and its ETag.
+    """
+
+    def __init__(self, ttl_seconds=STATION_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Call after any station create/update/delete."""
+        with self._lock:
+            self.version += 1
+
+    def _is_fresh(self, snapshot):
+        return (
+            snapshot is not None
+            and snapshot.version == self.version
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    def get(self, db):
+        """Returns the current StationSnapshot, reloading it with `db` if stale."""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+
+            from database import Station
+
+            version = self.version
+            rows = db.query(Station).order_by(Station.id).all()
+            stations = tuple(
+                CachedStation(s.id, s.name, s.code, s.latitude, s.longitude, s.station_master_email)
+                for s in rows
+            )
+            payload = json.dumps([s._asdict() for s in stations], separators=(",", ":")).encode()
+            # Content-based ETag, so every worker process agrees on it
+            etag = f'"stations-{hashlib.sha1(payload).hexdigest()[:16]}"'
+
+            self._snapshot = StationSnapshot(stations, payload, etag, version)
+            self._loaded_at = time.monotonic()
+            return self._snapshot
+
+    def stations(self, db):
+        return self.get(db).stations
+
+station_cache = StationCache()
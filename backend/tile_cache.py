@@ -0,0 +1,52 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Aggregated map tiles are cheap to serve and expensive to build, so keep the
+# most recently requested ones around until a defect write invalidates them.
+TILE_CACHE_MAX_ENTRIES = int(os.getenv("TILE_CACHE_MAX_ENTRIES", "2048"))
+TILE_CACHE_TTL_SECONDS = float(os.getenv("TILE_CACHE_TTL_SECONDS", "300"))
+
+class TileCache:
+    """
+    LRU cache of cluster payloads keyed by (zoom, x, y).
+    Entries are tagged with the data version they were built from, so a
+    single `invalidate()` call drops every tile without walking the cache.
+    """
+
+    def __init__(self, max_entries=TILE_CACHE_MAX_ENTRIES, ttl_seconds=TILE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, created_at, payload = entry
+            if version != self.version or time.monotonic() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, version):
+        with self._lock:
+            # A write landed while this tile was being built; don't cache stale data
+            if version != self.version:
+                return
+            self._entries[key] = (version, time.monotonic(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+tile_cache = TileCache()
@@ -0,0 +1,126 @@
+"""
+Capture thread that keeps only the newest frame.
+
+The thread calls grab() continuously, so the camera's own buffer never
+fills with stale frames, but it only decodes (retrieve()) the frame a
+consumer actually asked for. Video files are paced to their frame rate,
+so they behave like a live feed (e.g. as a stand-in for an RTSP stream).
+
+sample_video() is the offline counterpart used by --mode video: it reads a
+recorded file as fast as possible and only retrieves the sampled frames.
+"""
+import os
+import time
+import threading
+
+import cv2
+
+# Offline sampling seeks instead of grabbing once the stride is at least this many frames
+VIDEO_SEEK_MIN_STRIDE = int(os.getenv("VIDEO_SEEK_MIN_STRIDE", "60"))
+
+class LatestFrameCapture:
+    def __init__(self, source, loop=False):
+        self.source = source
+        self.loop = loop
+        self.cap = cv2.VideoCapture(source)
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self.grabbed = 0
+        self.decoded = 0
+        self.ended = False
+        self._frame = None
+        self._frame_index = 0
+        self._requested = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self._stop.is_set():
+            if not self.cap.grab():
+                if self.loop and self.is_file and self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                    continue
+                break
+
+            with self._cond:
+                self.grabbed += 1
+                wanted = self._requested is not None and self.grabbed >= self._requested
+            if wanted:
+                ok, frame = self.cap.retrieve()
+                with self._cond:
+                    if ok:
+                        self._frame, self._frame_index = frame, self.grabbed
+                        self._requested = None
+                        self.decoded += 1
+                    self._cond.notify_all()
+
+            if self.frame_interval:
+                next_time += self.frame_interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1:
+                    # Fell far behind (e.g. a slow disk); don't try to catch up in a burst
+                    next_time = time.monotonic()
+
+        with self._cond:
+            self.ended = True
+            self._cond.notify_all()
+
+    def read(self, min_index=0, timeout=None):
+        """
+        Newest frame once at least `min_index` frames have been grabbed.
+        Only this frame is decoded. Returns (frame_index, frame), or
+        (None, None) once the source has ended or on timeout.
+        """
+        with self._cond:
+            target = max(min_index, self.grabbed + 1)
+            self._requested = target
+            self._cond.wait_for(lambda: self._frame_index >= target or self.ended, timeout)
+            if self._frame_index >= target:
+                return self._frame_index, self._frame
+            return None, None
+
+    def stats(self):
+        with self._cond:
+            return {"frames": self.grabbed, "decoded": self.decoded}
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.cap.release()
+
+def sample_video(cap, stride, seek_min_stride=VIDEO_SEEK_MIN_STRIDE):
+    """
+    Yields (frame_index, frame) for every `stride`-th frame of an opened
+    video file, as fast as it can be read. Skipped frames are only grab()bed
+    (no colour conversion or copy); from `seek_min_stride` on it seeks
+    instead, which lets the decoder jump between keyframes.
+    """
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    seek = stride >= seek_min_stride and frame_count > 0
+    index = 0
+    while True:
+        if seek and (index >= frame_count or not cap.set(cv2.CAP_PROP_POS_FRAMES, index)):
+            return
+        ok, frame = cap.read()
+        if not ok:
+            return
+        yield index, frame
+        if not seek:
+            for _ in range(stride - 1):
+                if not cap.grab():
+                    return
+        index += stride
@@ -0,0 +1,96 @@
+"""
+Cheap on-device checks that run before a frame is sent to the model.
+
+FrameDeduplicator skips frames while the drone hovers over the same spot:
+a dHash of the downscaled grayscale frame is compared with the hash of the
+frame sampled just before it, and one within a small Hamming distance is
+treated as a duplicate. Older frames are never compared, since track
+imagery repeats (sleeper after sleeper) without being the same place, and
+a run of skips is cut short so a change too small for the hash (a fresh
+crack) still reaches the model.
+
+QualityGate rejects frames that can't show a defect anyway: motion blur
+(low variance of the Laplacian), too dark or too bright on average, or
+mostly clipped to black/white. Metrics are computed on a grayscale copy
+at most QUALITY_MAX_WIDTH wide, so thresholds don't depend on resolution.
+"""
+import time
+import threading
+
+import cv2
+import numpy as np
+
+def to_gray(frame):
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def dhash(frame, hash_size=8):
+    """Difference hash: one bit per horizontally adjacent pixel pair of a (hash_size+1) x hash_size thumbnail."""
+    small = cv2.resize(to_gray(frame), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def frame_quality(frame, max_width=640):
+    """Sharpness (Laplacian variance), mean brightness and fraction of clipped pixels."""
+    gray = to_gray(frame)
+    if gray.shape[1] > max_width:
+        height = round(gray.shape[0] * max_width / gray.shape[1])
+        gray = cv2.resize(gray, (max_width, height), interpolation=cv2.INTER_AREA)
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    return {
+        "sharpness": float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        "brightness": float(gray.mean()),
+        "clipped": float((hist[:6].sum() + hist[250:].sum()) / gray.size)
+    }
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class FrameDeduplicator:
+    def __init__(self, max_distance=5, max_age_seconds=2.0, max_skips=10, hash_size=8):
+        self.max_distance = max_distance
+        self.max_age_seconds = max_age_seconds
+        self.max_skips = max_skips
+        self.hash_size = hash_size
+        self.previous = None
+        self.previous_at = 0.0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, frame):
+        """
+        True if `frame` is within max_distance of the previous sampled frame, taken
+        at most max_age_seconds ago, unless max_skips frames were skipped in a row.
+        """
+        frame_hash = dhash(frame, self.hash_size)
+        now = time.monotonic()
+        with self._lock:
+            duplicate = (
+                self.previous is not None
+                and now - self.previous_at <= self.max_age_seconds
+                and self.skipped < self.max_skips
+                and hamming(frame_hash, self.previous) <= self.max_distance
+            )
+            self.previous, self.previous_at = frame_hash, now
+            self.skipped = self.skipped + 1 if duplicate else 0
+            return duplicate
+
+class QualityGate:
+    def __init__(self, min_sharpness=50.0, min_brightness=30.0, max_brightness=225.0, max_clipped=0.5, max_width=640):
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.max_clipped = max_clipped
+        self.max_width = max_width
+
+    def check(self, frame):
+        """Reason the frame is unusable ("dark", "bright", "clipped", "blurry"), or None if it's fine."""
+        quality = frame_quality(frame, self.max_width)
+        if quality["brightness"] < self.min_brightness:
+            return "dark"
+        if quality["brightness"] > self.max_brightness:
+            return "bright"
+        if quality["clipped"] > self.max_clipped:
+            return "clipped"
+        if quality["sharpness"] < self.min_sharpness:
+            return "blurry"
+        return None
@@ -0,0 +1,170 @@
+"""
+Inference workers for the vision agent.
+
+PullWorkers (drone mode) fetch their own frames: an idle worker reads the
+next sampled frame from the capture and processes it, so frames are only
+read when a worker is free to run them and never wait in a queue.
+
+FrameWorkers (webcam mode, whose loop reads every frame to display it)
+take frames pushed into a FrameQueue.
+
+Frames waiting for the model are held in a FrameQueue of fixed capacity,
+so a slow model API can't grow memory or latency without bound. When the
+queue is full, the drop policy decides which frame is lost:
+- drop_oldest: evict the oldest queued frame and enqueue the new one
+- drop_newest: keep the queue as is and discard the new frame
+- keep_latest: hold only the newest frame (capacity 1)
+"""
+import threading
+from collections import deque
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "keep_latest")
+
+class FrameQueue:
+    def __init__(self, capacity=4, policy="drop_oldest"):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}, expected one of {DROP_POLICIES}")
+        if capacity < 1:
+            raise ValueError("Queue capacity must be at least 1")
+        self.policy = policy
+        self.capacity = 1 if policy == "keep_latest" else capacity
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, frame):
+        """Queue a frame. Returns False if a frame had to be dropped to make room (or this one was)."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("FrameQueue is closed")
+            if len(self._items) >= self.capacity:
+                self.dropped += 1
+                if self.policy == "drop_newest":
+                    return False
+                self._items.popleft()
+                accepted = False
+            else:
+                accepted = True
+            self._items.append(frame)
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify()
+            return accepted
+
+    def get(self, timeout=None):
+        """Next frame, or None once the queue is closed and drained (or on timeout)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        """Stop accepting frames; get() returns the remaining ones, then None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def depth(self):
+        with self._cond:
+            return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._items),
+                "queue_max_depth": self.max_depth,
+                "queued": self.enqueued,
+                "dropped": self.dropped
+            }
+
+class FrameWorkers:
+    """Worker threads calling `handler(frame)` for frames taken from a FrameQueue."""
+
+    def __init__(self, handler, workers=2, capacity=4, policy="drop_oldest"):
+        self.handler = handler
+        self.queue = FrameQueue(capacity, policy)
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, frame):
+        return self.queue.put(frame)
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                return
+            try:
+                self.handler(frame)
+            except Exception as e:
+                print(f"❌ Error in frame worker: {e}")
+
+    def stats(self):
+        return self.queue.stats()
+
+    def shutdown(self):
+        """Finish the queued frames and stop the workers."""
+        self.queue.close()
+        for thread in self.threads:
+            thread.join()
+
+class PullWorkers:
+    """
+    Worker threads that each call `next_frame()` when idle, then `handler(frame)`.
+    Reads are serialized, so one worker at a time waits on the source.
+    next_frame returns None to try again; call stop() (e.g. from next_frame
+    once the source ends) to let the workers finish.
+    """
+
+    def __init__(self, next_frame, handler, workers=2):
+        self.next_frame = next_frame
+        self.handler = handler
+        self.busy = 0
+        self._read_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._read_lock:
+                if self._stop.is_set():
+                    return
+                frame = self.next_frame()
+            if frame is None:
+                continue
+            with self._lock:
+                self.busy += 1
+            try:
+                self.handler(frame)
+            except Exception as e:
+                print(f"❌ Error in frame worker: {e}")
+            finally:
+                with self._lock:
+                    self.busy -= 1
+
+    def busy_workers(self):
+        with self._lock:
+            return self.busy
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        """True once stopped; waits up to `timeout` seconds."""
+        return self._stop.wait(timeout)
+
+    def shutdown(self):
+        """Stop taking frames and wait for the ones in progress."""
+        self._stop.set()
+        for thread in self.threads:
+            thread.join()
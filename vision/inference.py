@@ -0,0 +1,224 @@
+"""
+Inference backends for the vision agent, chosen with MODEL_BACKEND:
+- remote: the model API over HTTP (RemoteBackend)
+- local: an ONNX classifier run in-process on the CPU (LocalBackend)
+
+Both take a JPEG and return {"prediction", "confidence"} like the model
+API, and both can group frames from concurrent inference workers into
+batches (MicroBatcher): frames are collected until `max_batch_size` are
+waiting or the oldest has waited `max_wait_ms`. Batches only fill up if
+enough callers are waiting at once, so run at least max_batch_size
+inference workers.
+
+RemoteBackend sends a batch as one multipart request (one "files" part per
+image) to the batch endpoint, which answers {"predictions": [...]} in the
+same order. If the server has no batch endpoint (404/405/501), it switches
+to one request per frame for the rest of its lifetime.
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import requests
+
+UNSUPPORTED_STATUSES = (404, 405, 501)
+MODEL_OUTPUTS = ("logits", "probs")
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+class MicroBatcher:
+    """Turns concurrent submit(item) calls into `run_batch(items) -> results` calls."""
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=50, max_in_flight=2):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._runners = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._thread = None
+
+    def submit(self, item):
+        """Result for `item`, once its batch has run."""
+        future = Future()
+        with self._cond:
+            self._pending.append((item, future, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return future.result()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                deadline = self._pending[0][2] + self.max_wait
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.max_batch_size, max(0, deadline - time.monotonic())
+                )
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch_size, len(self._pending)))]
+            self._runners.submit(self._run, batch)
+
+    def _run(self, batch):
+        try:
+            results = self.run_batch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch of {len(batch)} items got {len(results)} results")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+class RemoteBackend:
+    name = "remote"
+
+    def __init__(self, url, batch_url=None, max_batch_size=8, max_wait_ms=50, max_in_flight=2, timeout=30):
+        self.url = url
+        self.batch_url = batch_url
+        self.timeout = timeout
+        self.batching = bool(batch_url) and max_batch_size > 1
+        self.session = requests.Session()
+        self.stats = {"requests": 0, "batches": 0, "frames": 0}
+        self._lock = threading.Lock()
+        self.batcher = MicroBatcher(self._post_batch, max_batch_size, max_wait_ms, max_in_flight) \
+            if self.batching else None
+
+    def _count(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+    def _post_one(self, image):
+        response = self.session.post(
+            self.url, files={"file": ("image.jpg", image, "image/jpeg")}, timeout=self.timeout
+        )
+        self._count(requests=1, frames=1)
+        return response.json()
+
+    def _post_batch(self, images):
+        if self.batching:
+            response = self.session.post(
+                self.batch_url,
+                files=[("files", (f"image{i}.jpg", image, "image/jpeg")) for i, image in enumerate(images)],
+                timeout=self.timeout
+            )
+            if response.status_code not in UNSUPPORTED_STATUSES:
+                response.raise_for_status()
+                self._count(requests=1, batches=1, frames=len(images))
+                return response.json()["predictions"]
+            with self._lock:
+                switched, self.batching = self.batching, False
+            if switched:
+                print(f"⚠️ Model API has no batch endpoint ({response.status_code}), sending frames one by one")
+        # Batch endpoint unsupported: frames already queued go one by one too
+        return [self._post_one(image) for image in images]
+
+    def predict(self, image):
+        """Prediction dict ({"prediction", "confidence"}) for one JPEG-encoded image."""
+        if self.batching:
+            return self.batcher.submit(image)
+        return self._post_one(image)
+
+def load_onnx_engine(model_path, threads):
+    """
+    (engine name, run(blob) -> scores, input shape or None). Uses ONNX Runtime
+    if installed, otherwise OpenCV's DNN module (NCHW input, not thread-safe).
+    """
+    try:
+        import onnxruntime
+    except ImportError:
+        onnxruntime = None
+
+    if onnxruntime is not None:
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        model_input = session.get_inputs()[0]
+        return "onnxruntime", lambda blob: session.run(None, {model_input.name: blob})[0], model_input.shape
+
+    net = cv2.dnn.readNetFromONNX(str(model_path))
+    cv2.setNumThreads(threads)
+    lock = threading.Lock()
+
+    def run(blob):
+        with lock:
+            net.setInput(blob)
+            return net.forward()
+    return "opencv", run, None
+
+class LocalBackend:
+    """
+    Classifier exported to ONNX, loaded once and run on the CPU. The input
+    layout (NCHW/NHWC) and size are read from the model when it declares
+    them. `output` says what the model emits: "logits" (softmax is applied,
+    or a sigmoid for a single output) or "probs"; a single output is the
+    score of labels[0]. Also used by the backend (backend/inference.py).
+    """
+    name = "local"
+
+    def __init__(self, model_path, labels=("Defective", "Non Defective"), input_size=224,
+                 normalize="imagenet", threads=2, max_batch_size=8, max_wait_ms=10, output="logits"):
+        if output not in MODEL_OUTPUTS:
+            raise ValueError(f"Unknown model output {output!r}, expected one of {MODEL_OUTPUTS}")
+        self.labels = list(labels)
+        self.normalize = normalize
+        self.output = output
+        self.engine, self._run, shape = load_onnx_engine(model_path, threads)
+
+        shape = list(shape) if shape else [None, 3, input_size, input_size]
+        self.channels_first = shape[1] in (1, 3)
+        height, width = (shape[2], shape[3]) if self.channels_first else (shape[1], shape[2])
+        self.input_size = (width if isinstance(width, int) else input_size,
+                           height if isinstance(height, int) else input_size)
+        # Models exported with a fixed batch of 1 get one forward pass per frame
+        self.fixed_batch = shape[0] == 1
+        self.batcher = MicroBatcher(self.predict_batch, max_batch_size, max_wait_ms, max_in_flight=1) \
+            if max_batch_size > 1 else None
+        print(f"🧠 Loaded {model_path} with {self.engine} ({threads} threads, input {self.input_size})")
+
+    def preprocess(self, image):
+        frame = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode image")
+        rgb = cv2.cvtColor(cv2.resize(frame, self.input_size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+        tensor = rgb.astype(np.float32) / 255.0
+        if self.normalize == "imagenet":
+            tensor = (tensor - IMAGENET_MEAN) / IMAGENET_STD
+        return tensor
+
+    def postprocess(self, scores):
+        scores = np.asarray(scores, dtype=np.float64).ravel()
+        if scores.size == 1:
+            p = scores[0] if self.output == "probs" else 1 / (1 + np.exp(-scores[0]))
+            probs = np.array([p, 1 - p])
+        elif self.output == "probs":
+            probs = scores
+        else:
+            exp = np.exp(scores - scores.max())
+            probs = exp / exp.sum()
+        index = int(probs.argmax())
+        label = self.labels[index] if index < len(self.labels) else str(index)
+        return {"prediction": label, "confidence": round(float(probs[index]) * 100, 2)}
+
+    def predict_batch(self, images):
+        blob = np.stack([self.preprocess(image) for image in images])
+        if self.channels_first:
+            blob = np.ascontiguousarray(blob.transpose(0, 3, 1, 2))
+        if self.fixed_batch:
+            scores = np.concatenate([self._run(blob[i:i + 1]) for i in range(len(images))])
+        else:
+            scores = self._run(blob)
+        return [self.postprocess(row) for row in scores]
+
+    def predict(self, image):
+        """Prediction dict ({"prediction", "confidence"}) for one JPEG-encoded image."""
+        if self.batcher:
+            return self.batcher.submit(image)
+        return self.predict_batch([image])[0]
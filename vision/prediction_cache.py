@@ -0,0 +1,125 @@
+"""
+Cache of model predictions keyed by the content hash of the encoded image.
+
+The same JPEG bytes get the same prediction from the same model, so a
+re-sent image (a re-run upload folder, a frame that encodes identically)
+skips the model call. Keys include a namespace naming the model, so
+switching MODEL_BACKEND or model doesn't serve old answers.
+
+- memory tier: LRU of up to max_entries predictions
+- disk tier (optional, cache_dir): one small JSON file per prediction,
+  which survives restarts and is promoted to memory on a hit
+- coalescing: concurrent lookups of an image that is already being
+  predicted wait for that call instead of making their own
+Only successful predictions (with a "prediction" field) are cached.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+class InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class PredictionCache:
+    def __init__(self, namespace, max_entries=4096, ttl_seconds=7 * 24 * 3600, cache_dir=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.stats = {"memory": 0, "disk": 0, "coalesced": 0, "model": 0}
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def key(self, image):
+        return hashlib.sha256(self.namespace.encode() + b"\0" + image).hexdigest()
+
+    def _expired(self, created_at):
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key, result, created_at):
+        with self._lock:
+            self._entries[key] = (created_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return None if self._expired(entry["created_at"]) else entry
+
+    def _write_disk(self, key, result, created_at):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"created_at": created_at, "result": result}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Prediction cache write failed: {e}")
+
+    def get_or_compute(self, image, compute):
+        """
+        Prediction for the encoded `image`, calling `compute(image)` only on a miss.
+        Returns (result, source) with source "memory", "disk", "coalesced" or "model".
+        """
+        key = self.key(image)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.stats["memory"] += 1
+                return entry[1], "memory"
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[key] = InFlight()
+
+        if not owner:
+            flight.done.wait()
+            with self._lock:
+                self.stats["coalesced"] += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, "coalesced"
+
+        try:
+            entry = self._read_disk(key)
+            if entry is not None:
+                source, result, created_at = "disk", entry["result"], entry["created_at"]
+            else:
+                source, result, created_at = "model", compute(image), time.time()
+            if isinstance(result, dict) and "prediction" in result:
+                self._remember(key, result, created_at)
+                if source == "model":
+                    self._write_disk(key, result, created_at)
+            flight.result = result
+            with self._lock:
+                self.stats[source] += 1
+            return result, source
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
@@ -0,0 +1,61 @@
+"""
+Adaptive frame sampling for the live modes.
+
+The interval (in frames) between model calls starts at `base` and is
+recomputed before every sample:
+- never below what the model can sustain: smoothed model latency x fps /
+  workers, widened further (smoothly) by the frames waiting per worker
+- dropped to `min_interval` for the next `hold_samples` results after a
+  defect or a borderline confidence, so suspicious stretches get a closer look
+- always kept within [min_interval, max_interval]
+"""
+import threading
+
+class AdaptiveSampler:
+    def __init__(self, base=30, min_interval=5, max_interval=300, fps=30.0, workers=1,
+                 confidence_threshold=70.0, borderline_margin=10.0, hold_samples=10, smoothing=0.3):
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fps = fps or 30.0
+        self.workers = max(1, workers)
+        self.confidence_threshold = confidence_threshold
+        self.borderline_margin = borderline_margin
+        self.hold_samples = hold_samples
+        self.smoothing = smoothing
+        self.latency = None
+        self.hot = 0
+        self.backlog_factor = 1.0
+        self.interval = self.clamp(base)
+        self._lock = threading.Lock()
+
+    def clamp(self, interval):
+        return int(min(self.max_interval, max(self.min_interval, round(interval))))
+
+    def observe(self, result):
+        """Feed back a process_frame result (frames skipped before the model call are ignored)."""
+        if not result or "confidence" not in result:
+            return
+        with self._lock:
+            # Cached predictions say nothing about model latency
+            if "latency_ms" in result:
+                latency = result["latency_ms"] / 1000
+                self.latency = latency if self.latency is None else \
+                    self.smoothing * latency + (1 - self.smoothing) * self.latency
+            if result.get("defect") or result.get("confidence", 100) < self.confidence_threshold + self.borderline_margin:
+                self.hot = self.hold_samples
+            elif self.hot:
+                self.hot -= 1
+
+    def next_interval(self, queue_depth=0):
+        """Frames to skip before the next sample, given the current queue backlog."""
+        with self._lock:
+            # A backlog means the latency estimate is too optimistic: widen by the frames
+            # waiting per worker, smoothed so the interval eases back as the queue drains
+            # instead of snapping between widened and base
+            target_factor = min(1.0 + queue_depth / self.workers, 8.0)
+            self.backlog_factor += self.smoothing * (target_factor - self.backlog_factor)
+            target = self.min_interval if self.hot else self.base
+            capacity = self.latency * self.fps / self.workers if self.latency else 0
+            self.interval = self.clamp(max(target, capacity) * self.backlog_factor)
+            return self.interval
@@ -7,6 +7,15 @@ import time
 import os
 import datetime
 import random
+import uuid
+import json
+import threading
+from frame_queue import FrameWorkers, PullWorkers, DROP_POLICIES
+from capture import LatestFrameCapture, sample_video
+from frame_filters import FrameDeduplicator, QualityGate
+from sampler import AdaptiveSampler
+from inference import RemoteBackend, LocalBackend
+from prediction_cache import PredictionCache
 from concurrent.futures import ThreadPoolExecutor
 import sys
 import argparse
@@ -20,10 +29,54 @@ except ImportError:
 
 # Configuration
 MODEL_API_URL = os.getenv("MODEL_API_URL", "https://vishalbhagat01-railway.hf.space/predict")
+# Model backend (see inference.py): "remote" calls MODEL_API_URL, "local" runs MODEL_PATH (ONNX) on the CPU
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "remote")
+MODEL_PATH = os.getenv("MODEL_PATH", "models/track_classifier.onnx")
+MODEL_LABELS = os.getenv("MODEL_LABELS", "Defective,Non Defective").split(",")
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", "224"))
+MODEL_NORMALIZE = os.getenv("MODEL_NORMALIZE", "imagenet")  # imagenet | unit (0-1 only)
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", "2"))
+MODEL_OUTPUT = os.getenv("MODEL_OUTPUT", "logits")  # logits | probs
+# Reuse predictions for byte-identical encoded frames (see prediction_cache.py); a directory adds a disk tier
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "4096"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+# Batch model calls of concurrent frames; 1 sends every frame on its own
+MODEL_BATCH_API_URL = os.getenv("MODEL_BATCH_API_URL", MODEL_API_URL.rstrip("/") + "/batch")
+MODEL_BATCH_SIZE = int(os.getenv("MODEL_BATCH_SIZE", "1"))
+MODEL_BATCH_WAIT_MS = float(os.getenv("MODEL_BATCH_WAIT_MS", "50"))
 BACKEND_API_URL = os.getenv("BACKEND_API_URL", "http://localhost:8000/analyze")
 CONFIDENCE_THRESHOLD = 70.0  # Safety threshold
 CAMERA_SOURCE = 0 # 0 for webcam, or path to video file
 SAVE_DIR = "captured_defects"
+BACKEND_MAX_RETRIES = int(os.getenv("BACKEND_MAX_RETRIES", "3"))
+STATS_INTERVAL_SECONDS = float(os.getenv("STATS_INTERVAL_SECONDS", "5"))
+# Frames waiting for the model are bounded; see frame_queue.py for the drop policies
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "4"))
+FRAME_DROP_POLICY = os.getenv("FRAME_DROP_POLICY", "drop_oldest")
+# Skip frames whose dHash is within DEDUP_MAX_DISTANCE bits of the previous sampled frame (hovering),
+# if that was under DEDUP_MAX_AGE_SECONDS ago; every DEDUP_MAX_SKIPS duplicates in a row one goes through
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "5"))
+DEDUP_MAX_AGE_SECONDS = float(os.getenv("DEDUP_MAX_AGE_SECONDS", "2"))
+DEDUP_MAX_SKIPS = int(os.getenv("DEDUP_MAX_SKIPS", "10"))
+# Reject blurred, badly exposed or black frames locally (see frame_filters.py)
+QUALITY_GATE_ENABLED = os.getenv("QUALITY_GATE_ENABLED", "true").lower() == "true"
+QUALITY_MIN_SHARPNESS = float(os.getenv("QUALITY_MIN_SHARPNESS", "50"))
+QUALITY_MIN_BRIGHTNESS = float(os.getenv("QUALITY_MIN_BRIGHTNESS", "30"))
+QUALITY_MAX_BRIGHTNESS = float(os.getenv("QUALITY_MAX_BRIGHTNESS", "225"))
+QUALITY_MAX_CLIPPED = float(os.getenv("QUALITY_MAX_CLIPPED", "0.5"))
+QUALITY_MAX_WIDTH = int(os.getenv("QUALITY_MAX_WIDTH", "640"))
+# Live modes sample every SAMPLE_INTERVAL_FRAMES frames, adapted within [MIN, MAX] (see sampler.py)
+SAMPLE_INTERVAL_FRAMES = int(os.getenv("SAMPLE_INTERVAL_FRAMES", "30"))
+SAMPLE_MIN_FRAMES = int(os.getenv("SAMPLE_MIN_FRAMES", "5"))
+SAMPLE_MAX_FRAMES = int(os.getenv("SAMPLE_MAX_FRAMES", "300"))
+SAMPLE_BORDERLINE_MARGIN = float(os.getenv("SAMPLE_BORDERLINE_MARGIN", "10"))
+SAMPLE_HOLD_SAMPLES = int(os.getenv("SAMPLE_HOLD_SAMPLES", "10"))
+DEFAULT_LAT = 28.6139
+DEFAULT_LON = 77.2090
 
 # Ensure save directory exists
 os.makedirs(SAVE_DIR, exist_ok=True)
@@ -33,6 +86,63 @@ current_lat = None
 current_lon = None
 location_initialized = False
 
+# Counters printed on STATS lines in drone mode (parsed by the backend fleet supervisor)
+stats_lock = threading.Lock()
+stats = {"frames": 0, "processed": 0, "duplicates": 0, "rejected": 0, "cache_hits": 0, "detections": 0, "errors": 0,
+         "backend_errors": 0}
+
+def create_model_backend():
+    if MODEL_BACKEND == "local":
+        return LocalBackend(MODEL_PATH, MODEL_LABELS, MODEL_INPUT_SIZE, MODEL_NORMALIZE, MODEL_THREADS,
+                            MODEL_BATCH_SIZE, MODEL_BATCH_WAIT_MS, MODEL_OUTPUT)
+    if MODEL_BACKEND != "remote":
+        raise ValueError(f"Unknown MODEL_BACKEND {MODEL_BACKEND!r}, expected 'remote' or 'local'")
+    return RemoteBackend(MODEL_API_URL, MODEL_BATCH_API_URL, MODEL_BATCH_SIZE, MODEL_BATCH_WAIT_MS)
+
+model_backend = create_model_backend()
+prediction_cache = PredictionCache(
+    f"local:{MODEL_PATH}:{MODEL_OUTPUT}" if MODEL_BACKEND == "local" else f"remote:{MODEL_API_URL}",
+    PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS, PREDICTION_CACHE_DIR or None
+) if PREDICTION_CACHE_ENABLED else None
+
+def call_model(image):
+    print("📡 Calling ML model API..." if model_backend.name == "remote" else "🧠 Running local model...")
+    return model_backend.predict(image)
+
+def predict(image):
+    """Model prediction for an encoded image through the prediction cache. Returns (data, source)."""
+    if prediction_cache is None:
+        return call_model(image), "model"
+    return prediction_cache.get_or_compute(image, call_model)
+deduplicator = FrameDeduplicator(DEDUP_MAX_DISTANCE, DEDUP_MAX_AGE_SECONDS, DEDUP_MAX_SKIPS) if DEDUP_ENABLED else None
+quality_gate = QualityGate(
+    QUALITY_MIN_SHARPNESS, QUALITY_MIN_BRIGHTNESS, QUALITY_MAX_BRIGHTNESS, QUALITY_MAX_CLIPPED, QUALITY_MAX_WIDTH
+) if QUALITY_GATE_ENABLED else None
+
+def count(key, amount=1):
+    with stats_lock:
+        stats[key] = stats.get(key, 0) + amount
+
+def print_stats(worker_id, fps, extra=None):
+    """One machine-readable line: STATS {"worker": ..., "fps": ..., "frames": ..., ...}"""
+    with stats_lock:
+        snapshot = dict(stats)
+    print("STATS " + json.dumps({"worker": worker_id, "fps": round(fps, 2), **snapshot, **(extra or {})}), flush=True)
+
+def start_frame_workers(sampler=None):
+    handler = (lambda frame: sampler.observe(process_frame(frame))) if sampler else process_frame
+    return FrameWorkers(handler, INFERENCE_WORKERS, FRAME_QUEUE_SIZE, FRAME_DROP_POLICY)
+
+def create_sampler(fps):
+    return AdaptiveSampler(
+        SAMPLE_INTERVAL_FRAMES, SAMPLE_MIN_FRAMES, SAMPLE_MAX_FRAMES, fps, INFERENCE_WORKERS,
+        CONFIDENCE_THRESHOLD, SAMPLE_BORDERLINE_MARGIN, SAMPLE_HOLD_SAMPLES
+    )
+
+def parse_source(value):
+    """Camera index for digits (e.g. "0"), otherwise a video file path or stream URL."""
+    return int(value) if str(value).isdigit() else value
+
 def get_actual_location():
     """Gets actual GPS location using IP geolocation."""
     if not GEOCODER_AVAILABLE:
@@ -126,34 +236,82 @@ def get_location_metadata():
         "nearest_station": "Detected Location"
     }
 
-def process_frame(frame, save_image=True):
+def post_to_backend(payload):
+    """
+    Posts a detection to the backend, retrying on connection errors and 5xx.
+    The same Idempotency-Key is sent on every attempt, so a retry after a
+    lost response can't create a duplicate defect.
+    """
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    
+    for attempt in range(BACKEND_MAX_RETRIES + 1):
+        try:
+            response = requests.post(BACKEND_API_URL, json=payload, headers=headers, timeout=30)
+            if response.status_code < 500 or attempt == BACKEND_MAX_RETRIES:
+                return response
+            print(f"⚠️ Backend returned {response.status_code}, retrying...")
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            if attempt == BACKEND_MAX_RETRIES:
+                raise
+            print(f"⚠️ Backend unreachable, retrying ({attempt + 1}/{BACKEND_MAX_RETRIES})...")
+        time.sleep(min(2 ** attempt, 10))
+
+def process_frame(frame, save_image=True, prefilter=True):
     """
-    1. Encodes frame.
-    2. Sends to Model API.
-    3. If defective, sends to Backend.
+    1. Skips the frame if it's unusable (blur/exposure) or repeats the previous one.
+    2. Encodes frame.
+    3. Sends to Model API.
+    4. If defective, sends to Backend.
     
     Args:
         frame: Image frame to process
         save_image: Whether to save the image (for uploaded images, set to False initially)
+        prefilter: Whether the quality gate and deduplication run (off for manually uploaded images)
+    
+    Returns a result dict (prediction, confidence, defect, image, plus backend_error if a
+    detection couldn't be delivered), {"skipped": reason} or {"error": ...}.
     """
+    if prefilter and quality_gate:
+        reason = quality_gate.check(frame)
+        if reason:
+            count("rejected")
+            count(f"rejected_{reason}")
+            print(f"🌫️ Frame rejected by quality gate ({reason}), skipping model call")
+            return {"skipped": reason}
+
+    if prefilter and deduplicator and deduplicator.is_duplicate(frame):
+        count("duplicates")
+        print("♻️ Frame looks like the previous one (hovering), skipping model call")
+        return {"skipped": "duplicate"}
+
+    count("processed")
     try:
         _, img_encoded = cv2.imencode('.jpg', frame)
-        files = {'file': ('image.jpg', img_encoded.tobytes(), 'image/jpeg')}
         
-        # Call Model API
-        print("📡 Calling ML model API...")
-        response = requests.post(MODEL_API_URL, files=files, timeout=30)
-        data = response.json()
+        # Call Model API (or reuse the prediction for identical bytes)
+        model_started = time.time()
+        data, source = predict(img_encoded.tobytes())
+        latency_ms = round((time.time() - model_started) * 1000)
+        if source != "model":
+            count("cache_hits")
+            print(f"💡 Prediction reused from cache ({source})")
         
         # Parse Response
         prediction = data.get("prediction", "Unknown")
         confidence = float(data.get("confidence", 0))
         
         print(f"📊 Prediction: {prediction}, Confidence: {confidence}%")
+        result = {"prediction": prediction, "confidence": confidence, "defect": False, "image": None}
+        if source == "model":
+            result["latency_ms"] = latency_ms
+        else:
+            result["cached"] = source
         
         if prediction == "Defective" and confidence > CONFIDENCE_THRESHOLD:
             print("🚨 DEFECT DETECTED! Processing...")
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            count("detections")
+            result["defect"] = True
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             filename = f"defect_{timestamp}.jpg"
             filepath = os.path.join(SAVE_DIR, filename)
             
@@ -163,6 +321,7 @@ def process_frame(frame, save_image=True):
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             cv2.imwrite(filepath, annotated_frame)
             print(f"💾 Image saved: {filepath}")
+            result["image"] = os.path.abspath(filepath)
             
             # Get location
             loc = get_location_metadata()
@@ -177,25 +336,47 @@ def process_frame(frame, save_image=True):
                 "nearest_station": loc["nearest_station"]
             }
             
+            # A delivery failure must not hide the detection itself (e.g. in video manifests)
             print("📤 Sending to backend for analysis...")
-            response = requests.post(BACKEND_API_URL, json=payload, timeout=30)
+            try:
+                response = post_to_backend(payload)
+            except requests.exceptions.Timeout:
+                count("backend_errors")
+                print("⏱️ Backend timed out, detection not delivered.")
+                result["backend_error"] = "timeout"
+                return result
+            except requests.exceptions.ConnectionError:
+                count("backend_errors")
+                print("🔌 Connection error. Make sure the backend is running.")
+                result["backend_error"] = "connection error"
+                return result
             
             if response.status_code == 200:
                 print(f"✅ Sent to backend successfully!")
-                result = response.json()
-                print(f"   Severity: {result.get('severity')}")
-                print(f"   Assigned Station: {result.get('assigned_station_id')}")
+                analysis = response.json()
+                print(f"   Severity: {analysis.get('severity')}")
+                print(f"   Assigned Station: {analysis.get('assigned_station_id')}")
+                result["defect_id"] = analysis.get("id")
             else:
+                count("backend_errors")
                 print(f"❌ Backend Error: {response.status_code} - {response.text}")
+                result["backend_error"] = f"HTTP {response.status_code}"
         else:
             print(f"✓ No defect detected (Confidence: {confidence}%)")
+        return result
             
     except requests.exceptions.Timeout:
+        count("errors")
         print("⏱️ Request timed out. The ML model API might be slow or unavailable.")
+        return {"error": "timeout"}
     except requests.exceptions.ConnectionError:
-        print("🔌 Connection error. Make sure the backend is running.")
+        count("errors")
+        print("🔌 Connection error. Make sure the ML model API is reachable.")
+        return {"error": "connection error"}
     except Exception as e:
+        count("errors")
         print(f"❌ Error processing frame: {e}")
+        return {"error": str(e)}
 
 def webcam_mode():
     """Live webcam capture mode"""
@@ -206,15 +387,16 @@ def webcam_mode():
         return
 
     frame_count = 0
-    PROCESS_EVERY_N_FRAMES = 30 
+    sampler = create_sampler(cap.get(cv2.CAP_PROP_FPS))
+    next_frame = sampler.interval
     
-    executor = ThreadPoolExecutor(max_workers=2)
+    workers = start_frame_workers(sampler)
 
     print("=" * 60)
     print("🎥 WEBCAM MODE - Starting Vision Agent...")
     print("=" * 60)
     print(f"📹 Press 'q' to quit")
-    print(f"🔄 Processing every {PROCESS_EVERY_N_FRAMES} frames")
+    print(f"🔄 Processing every {SAMPLE_MIN_FRAMES}-{SAMPLE_MAX_FRAMES} frames (adaptive)")
     print("=" * 60)
 
     while True:
@@ -227,17 +409,19 @@ def webcam_mode():
         # Display the stream
         cv2.imshow('Railway Inspection Feed', frame)
         
-        if frame_count % PROCESS_EVERY_N_FRAMES == 0:
-            print(f"\n⏱️ Frame {frame_count} - Processing...")
-            executor.submit(process_frame, frame.copy())
+        if frame_count >= next_frame:
+            next_frame = frame_count + sampler.next_interval(workers.queue.depth())
+            print(f"\n⏱️ Frame {frame_count} - Processing (next in {sampler.interval} frames)...")
+            if not workers.submit(frame.copy()):
+                print(f"⚠️ Model can't keep up, dropped a frame ({FRAME_DROP_POLICY})")
             
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
             
     cap.release()
     cv2.destroyAllWindows()
-    executor.shutdown()
-    print("\n✅ Webcam mode stopped.")
+    workers.shutdown()
+    print(f"\n✅ Webcam mode stopped. Frames dropped by the queue: {workers.stats()['dropped']}")
 
 def image_upload_mode():
     """Manual image upload mode for testing"""
@@ -269,7 +453,7 @@ def image_upload_mode():
                 continue
             
             print("🔍 Processing image...")
-            process_frame(frame)
+            process_frame(frame, prefilter=False)
             print("\n✅ Image processed!")
             
         elif choice == "2":
@@ -298,7 +482,7 @@ def image_upload_mode():
                 
                 frame = cv2.imread(img_path)
                 if frame is not None:
-                    process_frame(frame)
+                    process_frame(frame, prefilter=False)
                 else:
                     print(f"  ⚠️ Skipped (could not read)")
             
@@ -309,68 +493,197 @@ def image_upload_mode():
         else:
             print("❌ Invalid choice. Please enter 1, 2, or 3.")
 
-def drone_mode():
-    """Drone mode: Non-interactive webcam processing for background operation"""
-    cap = cv2.VideoCapture(CAMERA_SOURCE)
+def drone_mode(source=CAMERA_SOURCE, latitude=DEFAULT_LAT, longitude=DEFAULT_LON, worker_id=None, loop=False):
+    """
+    Drone mode: Non-interactive processing for background operation.
+    `source` is a camera index, video file or stream URL; with `loop`, a
+    video file restarts from the beginning when it ends.
+    Returns False if the source could not be opened.
+    """
+    capture = LatestFrameCapture(source, loop=loop)
     
-    if not cap.isOpened():
-        print("❌ Error: Could not open camera.")
-        return
+    if not capture.is_opened():
+        print(f"❌ Error: Could not open camera/source: {source}")
+        capture.stop()
+        return False
 
-    frame_count = 0
-    PROCESS_EVERY_N_FRAMES = 30 
-    
-    executor = ThreadPoolExecutor(max_workers=2)
+    sampler = create_sampler(capture.cap.get(cv2.CAP_PROP_FPS))
+    schedule = {"next": sampler.interval, "missed": 0}
+
+    def next_frame():
+        # The capture thread grabs every frame but only decodes the one asked for;
+        # an idle worker asks for the frame that is due, or the newest if it's late
+        due = schedule["next"]
+        grabbed = capture.stats()["frames"]
+        frame_index, frame = capture.read(due, timeout=1.0)
+        if frame is None:
+            if capture.ended:
+                workers.stop()
+            return None
+        # Samples that came due while every worker was busy: the model is behind
+        missed = max(0, grabbed - due) // sampler.interval
+        schedule["missed"] += missed
+        schedule["next"] = frame_index + sampler.next_interval(missed)
+        print(f"\n⏱️ Frame {frame_index} - Processing (next in {sampler.interval} frames)...")
+        return frame
+
+    workers = PullWorkers(next_frame, lambda frame: sampler.observe(process_frame(frame)), INFERENCE_WORKERS)
+    capture.start()
+    workers.start()
 
     print("=" * 60)
     print("🚁 DRONE MODE - Starting Vision Agent in background...")
     print("=" * 60)
-    print(f"🔄 Processing every {PROCESS_EVERY_N_FRAMES} frames")
+    print(f"📹 Source: {source}" + (f" (worker {worker_id})" if worker_id else ""))
+    print(f"🔄 Processing every {SAMPLE_MIN_FRAMES}-{SAMPLE_MAX_FRAMES} frames (adaptive)")
     print("=" * 60)
 
-    # Use default location for drone mode to avoid interactive input
+    # Use the given (or default) location for drone mode to avoid interactive input
     global current_lat, current_lon, location_initialized
-    current_lat = 28.6139
-    current_lon = 77.2090
+    current_lat = latitude
+    current_lon = longitude
     location_initialized = True
-    print("✅ Using default location: New Delhi (28.6139, 77.2090)")
+    print(f"✅ Using location: {current_lat}, {current_lon}")
+
+    def worker_stats():
+        return {"busy_workers": workers.busy_workers(), "dropped": schedule["missed"], "interval": sampler.interval}
+
+    stats_started = time.time()
+    stats_frames = 0
 
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            frame_count += 1
-            
-            if frame_count % PROCESS_EVERY_N_FRAMES == 0:
-                print(f"\n⏱️ Frame {frame_count} - Processing...")
-                executor.submit(process_frame, frame.copy())
-                
+        # Workers pull and process frames; this thread only reports
+        while not workers.wait(STATS_INTERVAL_SECONDS):
+            elapsed = time.time() - stats_started
+            capture_stats = capture.stats()
+            print_stats(worker_id, (capture_stats["frames"] - stats_frames) / elapsed,
+                        {**capture_stats, **worker_stats()})
+            stats_started = time.time()
+            stats_frames = capture_stats["frames"]
             # No cv2.imshow or cv2.waitKey(1) in drone mode to avoid needing a GUI/input
-            time.sleep(0.01) # Small sleep to avoid maxing CPU
             
     except KeyboardInterrupt:
         print("\n🛑 Stopping Drone Mode...")
     finally:
-        cap.release()
-        executor.shutdown()
+        workers.shutdown()
+        capture.stop()
+        print_stats(worker_id, 0.0, {**capture.stats(), **worker_stats()})
         print("\n✅ Drone mode stopped.")
+    return True
+
+def video_mode(path, interval_seconds=None, stride=30, output=None,
+               latitude=DEFAULT_LAT, longitude=DEFAULT_LON):
+    """
+    Video mode: inspect a recorded flight offline, as fast as the model allows.
+    Samples one frame every `interval_seconds` of footage (or every `stride`
+    frames), runs them through INFERENCE_WORKERS parallel model calls and
+    writes a JSON manifest of the results. Returns the manifest path, or
+    None if the file could not be opened.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"❌ Error: Could not open video: {path}")
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    stride = max(1, round(fps * interval_seconds) if interval_seconds else stride)
+    output = output or os.path.join(SAVE_DIR, f"{os.path.splitext(os.path.basename(path))[0]}_manifest.json")
+
+    print("=" * 60)
+    print("🎞️ VIDEO MODE - Inspecting recorded footage...")
+    print("=" * 60)
+    print(f"📹 File: {path} ({frame_count} frames at {fps:.1f} fps)")
+    print(f"🔄 Sampling every {stride} frames ({stride / fps:.2f}s of footage)")
+    print("=" * 60)
+
+    global current_lat, current_lon, location_initialized
+    current_lat = latitude
+    current_lon = longitude
+    location_initialized = True
+
+    started = time.time()
+    results = []
+    pending = []
+
+    def collect(entry, future):
+        result = future.result() or {"error": "no result"}
+        results.append({**entry, **result})
+
+    try:
+        with ThreadPoolExecutor(max_workers=INFERENCE_WORKERS) as executor:
+            for frame_index, frame in sample_video(cap, stride):
+                entry = {"frame": frame_index, "timestamp": round(frame_index / fps, 3)}
+                print(f"\n⏱️ Frame {frame_index} ({entry['timestamp']}s) - Processing...")
+                pending.append((entry, executor.submit(process_frame, frame)))
+                # Keep only a few decoded frames in memory while the model works
+                while len(pending) > INFERENCE_WORKERS * 2:
+                    collect(*pending.pop(0))
+            for item in pending:
+                collect(*item)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping Video Mode, writing partial results...")
+    finally:
+        cap.release()
+
+    elapsed = time.time() - started
+    duration = frame_count / fps if fps else 0
+    manifest = {
+        "source": os.path.abspath(path),
+        "fps": fps,
+        "frames": frame_count,
+        "duration_seconds": round(duration, 2),
+        "stride": stride,
+        "sampled": len(results),
+        "defects": sum(1 for r in results if r.get("defect")),
+        "duplicates": sum(1 for r in results if r.get("skipped") == "duplicate"),
+        "rejected": sum(1 for r in results if r.get("skipped") not in (None, "duplicate")),
+        "errors": sum(1 for r in results if r.get("error")),
+        "backend_errors": sum(1 for r in results if r.get("backend_error")),
+        "elapsed_seconds": round(elapsed, 2),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": sorted(results, key=lambda r: r["frame"])
+    }
+    with open(output, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"\n✅ Inspected {len(results)} frames of {duration:.0f}s footage in {elapsed:.1f}s, "
+          f"{manifest['defects']} defect(s)")
+    print(f"📄 Manifest: {output}")
+    return output
 
 def main():
     """Main entry point with mode selection"""
+    global FRAME_DROP_POLICY
     parser = argparse.ArgumentParser(description='Railway Defect Detection Vision Agent')
-    parser.add_argument('--mode', choices=['webcam', 'upload', 'drone'], 
-                       help='Run mode: webcam (live), upload (test images), or drone (background)')
+    parser.add_argument('--mode', choices=['webcam', 'upload', 'drone', 'video'], 
+                       help='Run mode: webcam (live), upload (test images), drone (background) or video (recorded file)')
+    parser.add_argument('--source', default=str(CAMERA_SOURCE),
+                       help='Drone mode: camera index, video file or stream URL; video mode: video file')
+    parser.add_argument('--lat', type=float, default=DEFAULT_LAT, help='Drone/video mode: latitude of the inspected section')
+    parser.add_argument('--lon', type=float, default=DEFAULT_LON, help='Drone/video mode: longitude of the inspected section')
+    parser.add_argument('--worker-id', help='Drone mode: worker name reported on STATS lines')
+    parser.add_argument('--loop', action='store_true', help='Drone mode: replay a video file when it ends')
+    parser.add_argument('--interval', type=float, help='Video mode: seconds of footage between sampled frames')
+    parser.add_argument('--stride', type=int, default=30, help='Video mode: frames between samples (if no --interval)')
+    parser.add_argument('--output', help='Video mode: manifest path (default: captured_defects/<video>_manifest.json)')
+    parser.add_argument('--drop-policy', choices=DROP_POLICIES, default=FRAME_DROP_POLICY,
+                       help='What to drop when frames arrive faster than the model can process them')
     
     args = parser.parse_args()
     
+    FRAME_DROP_POLICY = args.drop_policy
+    
     # If mode specified via command line, use it
     if args.mode:
         if args.mode == 'webcam':
             webcam_mode()
         elif args.mode == 'drone':
-            drone_mode()
+            if not drone_mode(parse_source(args.source), args.lat, args.lon, args.worker_id, args.loop):
+                sys.exit(1)
+        elif args.mode == 'video':
+            if not video_mode(args.source, args.interval, args.stride, args.output, args.lat, args.lon):
+                sys.exit(1)
         else:
             image_upload_mode()
         return